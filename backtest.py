@@ -0,0 +1,499 @@
+"""
+Headless batch backtests of trading strategies.
+
+A strategy is a class built with its parameters as keyword arguments, with any of the callbacks
+
+    on_start(context)
+    on_tick(context)                 -> list of order requests or None
+    on_candle(candle, context)       -> list of order requests or None
+
+Order requests are made with market(), pending(), close() and cancel(). A run drives one Portfolio account
+through the order book and the liquidation sweep on every tick of a generated or replayed feed, with no clock
+and no GUI. Parameter sweeps run on a ProcessPoolExecutor and write one row of metrics per run to a single
+results file (.csv, .parquet or .json).
+
+Usage:
+    python backtest.py strategies:MovingAverageCross --ticks 100000 --param fast=5,10 --param slow=30,60 \\
+        --seeds 4 --output results.csv
+    python backtest.py my_strategy.py:Breakout --replay ticks.csv --output results.parquet
+"""
+
+import argparse
+import importlib
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from candles import CandleBuilder
+from engine import MARGIN_RATE, TradeError
+from journal import Journal
+from liquidation import Liquidator, STOP_OUT
+from orders import OrderBook
+from portfolio import Portfolio, side_of
+from price import correlated_price_paths
+from replay import iter_chunks, iter_csv_chunks
+from tickstore import TICK_DTYPE, TickStore
+
+logger = logging.getLogger(__name__)
+
+MARKET = 'market'
+PENDING = 'pending'
+CLOSE = 'close'
+CANCEL = 'cancel'
+START_TIME = datetime(2024, 1, 1)
+
+
+# Strategy API
+
+class Request:
+    """
+    An order request returned by a strategy callback.
+    """
+
+    __slots__ = ('action', 'mode', 'units', 'kind', 'price', 'stop_loss', 'take_profit', 'target')
+
+    def __init__(self, action, mode=None, units=None, kind=None, price=None, stop_loss=None, take_profit=None,
+                 target=None):
+        self.action = action
+        self.mode = mode
+        self.units = units
+        self.kind = kind
+        self.price = price
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.target = target
+
+    def __repr__(self):
+        return f"Request({self.action}, mode={self.mode}, units={self.units}, price={self.price})"
+
+
+def market(mode, units, stop_loss=None, take_profit=None):
+    """
+    Opens a position at the current price, with optional stop-loss and take-profit prices.
+    """
+    return Request(MARKET, mode, units, stop_loss=stop_loss, take_profit=take_profit)
+
+
+def pending(mode, kind, price, units):
+    """
+    Places a LIMIT or STOP entry order.
+    """
+    return Request(PENDING, mode, units, kind, price)
+
+
+def close(position=None):
+    """
+    Closes one position, or every open position when position is None.
+    """
+    return Request(CLOSE, target=position)
+
+
+def cancel(order_id):
+    """
+    Cancels a resting order.
+    """
+    return Request(CANCEL, target=order_id)
+
+
+class Strategy:
+    """
+    Base class of strategies; every callback is optional.
+    """
+
+    def __init__(self, **params):
+        self.params = params
+
+    def on_start(self, context):
+        pass
+
+    def on_tick(self, context):
+        return None
+
+    def on_candle(self, candle, context):
+        return None
+
+
+class Context:
+    """
+    What a strategy sees of the run: the current tick, its account and the finished candles.
+    """
+
+    def __init__(self, portfolio, book, account, candles):
+        self.portfolio = portfolio
+        self.book = book
+        self.account = account
+        self.candles = candles
+        self.bid = None
+        self.ask = None
+        self.time = None
+        self.timestamp = None
+        self.tick = -1
+
+    @property
+    def positions(self):
+        """
+        The ids of the account's open positions.
+        """
+        open_positions = self.portfolio.open_positions
+        return open_positions[self.portfolio.account[open_positions] == self.account]
+
+    def side(self, position):
+        """
+        Returns 'long' or 'short' for a position.
+        """
+        return 'long' if self.portfolio.side[position] > 0 else 'short'
+
+    @property
+    def balance(self):
+        return float(self.portfolio.balance[self.account])
+
+    @property
+    def equity(self):
+        return float(self.portfolio.equity[self.account])
+
+    @property
+    def free_margin(self):
+        return float(self.portfolio.free_margin[self.account])
+
+
+def load_strategy(spec):
+    """
+    Loads a strategy class from 'module:Class' or 'path/to/file.py:Class'.
+    """
+    module_name, _, class_name = spec.rpartition(':')
+    if not module_name or not class_name:
+        raise ValueError(f"Strategy {spec!r} is not of the form module:Class")
+    if module_name.endswith('.py'):
+        module_spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(module_name))[0],
+                                                             module_name)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+# Feeds
+
+def generated_feed(n_ticks, seed=None, interval=5, volatility=0.1, start_bid=1.0850, start_ask=1.0852):
+    """
+    Generates a seeded EUR/USD random walk with the model of price.price_generator.
+
+    Returns:
+        tuple: Bid prices, ask prices and datetime64 times of the ticks.
+    """
+    bid, ask = correlated_price_paths(n_ticks, [start_bid], [start_ask], volatility=volatility, seed=seed)
+    step = np.timedelta64(int(round(interval * 1e6)), 'us')
+    times = np.datetime64(START_TIME, 'us') + step * np.arange(n_ticks)
+    return bid[:, 0], ask[:, 0], times
+
+
+def replayed_feed(path, start=None, end=None):
+    """
+    Returns the ticks of a CSV or TickStore file.
+
+    The ticks of a TickStore file are slices of its memory map, so processes replaying the same file share
+    its pages instead of each holding a copy; a CSV file is parsed into memory.
+    """
+    if not path.lower().endswith('.csv'):
+        records = TickStore(path).between(start, end)
+        return records['bid'], records['ask'], records['time']
+    chunks = list(iter_chunks(path, start, end))
+    if not chunks:
+        return np.zeros(0), np.zeros(0), np.zeros(0, dtype='datetime64[us]')
+    bid, ask, times = zip(*chunks)
+    return np.concatenate(bid), np.concatenate(ask), np.concatenate(times).astype('datetime64[us]')
+
+
+def csv_to_store(path, store_path, start=None, end=None):
+    """
+    Converts the ticks of a CSV file between start and end to a TickStore file.
+    """
+    store = TickStore(store_path)
+    for bid, ask, times in iter_csv_chunks(path, start, end):
+        records = np.empty(len(bid), dtype=TICK_DTYPE)
+        records['time'] = times
+        records['bid'] = bid
+        records['ask'] = ask
+        store.extend(records)
+    return store_path
+
+
+# Runs
+
+def iter_feed(bid, ask, times, chunksize=65536):
+    """
+    Yields (bid, ask, datetime, timestamp) ticks, converting the arrays to Python values one chunk at a time.
+    """
+    for first in range(0, len(bid), chunksize):
+        chunk = slice(first, first + chunksize)
+        chunk_times = np.asarray(times[chunk]).astype('datetime64[us]')
+        yield from zip(np.asarray(bid[chunk]).tolist(), np.asarray(ask[chunk]).tolist(), chunk_times.tolist(),
+                       (chunk_times.astype(np.int64) / 1e6).tolist())
+
+
+def apply_requests(requests, context, journal, counters):
+    """
+    Executes the order requests of a strategy callback at the current tick; rejected requests are counted.
+    """
+    portfolio = context.portfolio
+    book = context.book
+    account = context.account
+    for request in requests:
+        try:
+            if request.action == MARKET:
+                position = int(portfolio.open_many([account], [side_of(request.mode)], [request.units],
+                                                   context.bid, context.ask, context.timestamp)[0])
+                if position < 0:
+                    raise TradeError("Not enough Funds !")
+                if request.stop_loss is not None or request.take_profit is not None:
+                    book.attach(position, account, request.mode, request.units, request.stop_loss,
+                                request.take_profit)
+            elif request.action == PENDING:
+                book.place(account, request.mode, request.kind, request.price, request.units)
+            elif request.action == CLOSE:
+                positions = context.positions if request.target is None else [request.target]
+                positions = [position for position in positions if portfolio.is_open[position]]
+                if positions:
+                    portfolio.close_many(positions, context.bid, context.ask, context.timestamp)
+                    journal.record_positions(portfolio, positions)
+                    for position in positions:
+                        book.cancel_position(position)
+            elif request.action == CANCEL:
+                book.cancel(request.target)
+            else:
+                raise TradeError(f"Unknown request {request.action!r}")
+        except TradeError as e:
+            counters['rejected_orders'] += 1
+            logger.debug("Rejected %r: %s", request, e)
+
+
+def run_backtest(strategy, bid, ask, times, balance=10000, margin_rate=MARGIN_RATE, timeframe=30,
+                 candles=1000):
+    """
+    Runs a strategy over a feed, tick by tick and without any pacing.
+
+    On every tick the account is marked to market and checked for stop-outs, triggered orders are filled,
+    then the strategy's on_candle (when the tick closes a candle) and on_tick callbacks are called and their
+    requests executed at the tick's prices. Positions still open after the last tick are closed.
+
+    Args:
+        strategy (Strategy): The strategy instance.
+        bid (numpy.ndarray): Bid prices of the ticks.
+        ask (numpy.ndarray): Ask prices of the ticks.
+        times (numpy.ndarray): datetime64 times of the ticks.
+        balance (float): Starting balance of the account.
+        margin_rate (float): Margin rate of the account.
+        timeframe (int): Timeframe in seconds of the candles passed to on_candle.
+        candles (int): The number of finished candles kept in context.candles.
+
+    Returns:
+        tuple: The Journal of the run and a dict of counters (ticks, rejected_orders, stop_outs).
+    """
+    portfolio = Portfolio()
+    account = portfolio.add_account(balance, margin_rate)
+    book = OrderBook()
+    liquidator = Liquidator(portfolio)
+    builder = CandleBuilder(timeframe, candles)
+    journal = Journal(max(len(bid), 1))
+    context = Context(portfolio, book, account, builder.candles)
+    counters = {'ticks': len(bid), 'rejected_orders': 0}
+
+    on_tick = getattr(strategy, 'on_tick', None)
+    on_candle = getattr(strategy, 'on_candle', None)
+    if hasattr(strategy, 'on_start'):
+        strategy.on_start(context)
+
+    for tick, (bid_price, ask_price, price_time, stamp) in enumerate(iter_feed(bid, ask, times)):
+        context.tick = tick
+        context.bid = bid_price
+        context.ask = ask_price
+        context.time = price_time
+        context.timestamp = stamp
+
+        liquidated = liquidator.sweep(bid_price, ask_price, stamp)
+        if len(liquidated):
+            journal.record_positions(portfolio, liquidated)
+            for position in liquidated.tolist():
+                book.cancel_position(position)
+        if book:
+            _, closed = book.execute(portfolio, bid_price, ask_price, stamp)
+            if len(closed):
+                journal.record_positions(portfolio, closed)
+
+        requests = []
+        candle = builder.update(bid_price, ask_price, price_time, stamp)
+        if candle is not None and on_candle is not None:
+            requests.extend(on_candle(candle, context) or ())
+        if on_tick is not None:
+            requests.extend(on_tick(context) or ())
+        if requests:
+            apply_requests(requests, context, journal, counters)
+        journal.record_equity(price_time, portfolio.status(account))
+
+    still_open = context.positions
+    if len(still_open):
+        portfolio.close_many(still_open, context.bid, context.ask, context.timestamp)
+        journal.record_positions(portfolio, still_open)
+    counters['stop_outs'] = int((liquidator.events['kind'] == STOP_OUT).sum())
+    counters['final_balance'] = float(portfolio.balance[account])
+    return journal, counters
+
+
+def run_config(task):
+    """
+    Runs one configuration of a sweep; executed in a worker process.
+
+    Returns:
+        dict: The row of the run in the results file.
+    """
+    run, spec, params, seed, feed, settings = task
+    if feed['replay'] is None:
+        bid, ask, times = generated_feed(feed['ticks'], np.random.default_rng(seed), feed['interval'],
+                                         feed['volatility'])
+    else:
+        bid, ask, times = replayed_feed(feed['replay'], feed['start'], feed['end'])
+    strategy = load_strategy(spec)(**params)
+
+    start = time.perf_counter()
+    journal, counters = run_backtest(strategy, bid, ask, times, **settings)
+    elapsed = time.perf_counter() - start
+
+    row = {'run': run, 'seed': seed.spawn_key[-1] if seed is not None else None}
+    row.update({f'param_{name}': value for name, value in params.items()})
+    row.update(journal.stats())
+    row.update(counters)
+    row['seconds'] = elapsed
+    return row
+
+
+def parse_value(text):
+    """
+    Reads a parameter value as JSON (numbers, booleans, null), falling back to the raw string.
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parameter_grid(specs):
+    """
+    Expands 'name=v1,v2,...' specifications to the cartesian product of their values.
+
+    Returns:
+        list: One dict of keyword arguments per combination.
+    """
+    names, choices = [], []
+    for spec in specs:
+        name, sep, values = spec.partition('=')
+        if not sep or not name:
+            raise ValueError(f"Parameter {spec!r} is not of the form name=v1,v2,...")
+        names.append(name.strip())
+        choices.append([parse_value(value.strip()) for value in values.split(',')])
+    return [dict(zip(names, combination)) for combination in itertools.product(*choices)]
+
+
+def run_sweep(spec, grid, seeds=1, seed=None, workers=None, ticks=10000, interval=5, volatility=0.1,
+              replay=None, start=None, end=None, **settings):
+    """
+    Runs every combination of a parameter grid on a ProcessPoolExecutor.
+
+    Generated feeds are seeded by children of a single SeedSequence, and every combination runs on the same
+    `seeds` feeds, so configurations are compared on identical prices and the results do not depend on the
+    number of workers. A replayed feed is the same for every run, so `seeds` is then ignored.
+
+    Args:
+        spec (str): The strategy, as accepted by load_strategy.
+        grid (list): Keyword arguments of the strategy, one dict per configuration.
+        seeds (int): The number of generated feeds every configuration runs on.
+        seed (int): Root seed; the same seed always gives the same results.
+        workers (int): The number of worker processes, defaults to the number of cores.
+        ticks (int): The number of ticks of a generated feed.
+        interval (float): Seconds between two generated ticks.
+        volatility (float): Largest relative move of a generated tick.
+        replay (str): CSV or TickStore file to replay instead of generating prices.
+        start (datetime): Start of the replayed period.
+        end (datetime): End of the replayed period.
+        **settings: Passed to run_backtest (balance, margin_rate, timeframe, candles).
+
+    Returns:
+        list: One row of metrics per run, in (configuration, seed) order.
+    """
+    # Fail in the parent rather than in every worker
+    load_strategy(spec)
+    directory = None
+    try:
+        if replay is not None and replay.lower().endswith('.csv'):
+            directory = tempfile.mkdtemp(prefix='backtest-')
+            replay = csv_to_store(replay, os.path.join(directory, 'ticks.bin'), start, end)
+            start = end = None
+        feed = {'ticks': ticks, 'interval': interval, 'volatility': volatility, 'replay': replay,
+                'start': start, 'end': end}
+        feed_seeds = [None] if replay is not None else np.random.SeedSequence(seed).spawn(seeds)
+        tasks = [(run, spec, params, feed_seed, feed, settings)
+                 for run, (params, feed_seed) in enumerate(itertools.product(grid, feed_seeds))]
+        if workers == 1:
+            return [run_config(task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(run_config, tasks))
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def write_results(rows, path):
+    """
+    Writes the rows of a sweep to one .csv, .parquet or .json file.
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame(rows)
+    if path.endswith('.parquet'):
+        frame.to_parquet(path, index=False)
+    elif path.endswith('.json'):
+        frame.to_json(path, orient='records', indent=1)
+    else:
+        frame.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch backtest of a strategy on generated or replayed ticks")
+    parser.add_argument('strategy', help="module:Class or path/to/file.py:Class")
+    parser.add_argument('--param', action='append', default=[],
+                        help="strategy parameter name=v1,v2,...; repeat to sweep their cartesian product")
+    parser.add_argument('--seeds', type=int, default=1, help="generated feeds run by every configuration")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--ticks', type=int, default=10000)
+    parser.add_argument('--interval', type=float, default=5)
+    parser.add_argument('--volatility', type=float, default=0.1)
+    parser.add_argument('--replay', help="CSV or TickStore file to replay instead of generating prices")
+    parser.add_argument('--start', type=datetime.fromisoformat, default=None)
+    parser.add_argument('--end', type=datetime.fromisoformat, default=None)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--balance', type=float, default=10000)
+    parser.add_argument('--margin-rate', type=float, default=MARGIN_RATE)
+    parser.add_argument('--timeframe', type=int, default=30, help="candle timeframe in seconds")
+    parser.add_argument('--output', default='backtest_results.csv', help=".csv, .parquet or .json results file")
+    args = parser.parse_args()
+
+    begin = time.perf_counter()
+    rows = run_sweep(args.strategy, parameter_grid(args.param), args.seeds, args.seed, args.workers, args.ticks,
+                     args.interval, args.volatility, args.replay, args.start, args.end, balance=args.balance,
+                     margin_rate=args.margin_rate, timeframe=args.timeframe)
+    write_results(rows, args.output)
+    print(f"{len(rows)} runs in {time.perf_counter() - begin:.1f} s, results in {args.output}")
+    for row in sorted(rows, key=lambda row: row['total_pl'], reverse=True)[:10]:
+        params = ', '.join(f"{key[6:]}={value}" for key, value in row.items() if key.startswith('param_'))
+        print(f"run {row['run']} ({params or 'defaults'}) seed {row['seed']}: total_pl {row['total_pl']:.2f}, "
+              f"trades {row['trades']}, sharpe {row['sharpe']:.4f}, max_drawdown {row['max_drawdown']:.2f}, "
+              f"stop_outs {row['stop_outs']}")
@@ -0,0 +1,473 @@
+"""
+Benchmarks of the tick -> candle -> P/L -> display pipeline.
+
+Every benchmark runs on seeded data and reports the best of `--repeat` runs as a rate (or a latency) in a
+JSON file, so results of two versions can be compared with --compare. Widgets run on the offscreen Qt
+platform; benchmarks whose optional dependencies (plotly, PyQt5) are missing are reported as skipped.
+
+Usage:
+    python bench.py --output bench.json
+    python bench.py --output new.json --compare bench.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+
+from candles import CandleBuilder
+from engine import Account, run as engine_run
+from feeds import TickBus, replayed_ticks
+from indicators import IndicatorSet, SMA, EMA, Bollinger, RSI, ATR, VWAP, ema, bollinger, rsi, atr, vwap
+from journal import Journal
+from liquidation import Liquidator
+from orders import OrderBook, LIMIT, STOP
+from portfolio import Portfolio
+from price import price_generator, price_paths, process_price
+
+BENCHMARKS = {}
+
+
+def benchmark(name, unit):
+    """
+    Registers a benchmark. The function receives the problem size and returns the number of units processed.
+    """
+    def register(function):
+        BENCHMARKS[name] = (function, unit)
+        return function
+    return register
+
+
+def sample_ticks(n_ticks, seed=0):
+    bid, ask, times = price_paths(n_ticks, 1, interval=1, seed=seed)
+    return bid[0], ask[0], times.astype(datetime)
+
+
+@benchmark('price_generator', 'ticks/s')
+def bench_price_generator(size):
+    bid, ask, _ = price_generator(0, 0, True)
+    for _ in range(size):
+        bid, ask, _ = price_generator(bid, ask)
+    return size
+
+
+@benchmark('price_paths', 'ticks/s')
+def bench_price_paths(size):
+    price_paths(size // 100, 100, seed=0)
+    return size // 100 * 100
+
+
+@benchmark('process_price', 'candles/s')
+def bench_process_price(size, ticks_per_candle=30):
+    bid, ask, times = sample_ticks(size)
+    prices = [{'ask': a, 'bid': b, 'time': t} for b, a, t in zip(bid.tolist(), ask.tolist(), times)]
+    windows = [prices[i:i + ticks_per_candle] for i in range(0, len(prices), ticks_per_candle)]
+    for window in windows:
+        process_price(window)
+    return len(windows)
+
+
+@benchmark('candle_builder', 'ticks/s')
+def bench_candle_builder(size):
+    bid, ask, times = sample_ticks(size)
+    stamps = (np.arange(size) + 1.7e9).tolist()
+    builder = CandleBuilder(30)
+    for b, a, t, s in zip(bid.tolist(), ask.tolist(), times, stamps):
+        builder.update(b, a, t, s)
+    return size
+
+
+@benchmark('account_on_tick', 'ticks/s')
+def bench_account(size):
+    bid, ask, times = sample_ticks(size)
+    account = Account(1e12)
+    account.on_tick(bid[0], ask[0], times[0])
+    account.open_position('long', 1000)
+    for b, a, t in zip(bid.tolist(), ask.tolist(), times):
+        account.on_tick(b, a, t)
+    return size
+
+
+@benchmark('tick_bus', 'ticks/s')
+def bench_tick_bus(size):
+    from clock import FastClock
+
+    bid, ask, times = sample_ticks(size)
+    builder = CandleBuilder(30)
+    bus = TickBus()
+    bus.subscribe(Account(1e12).on_tick)
+    bus.subscribe(builder.update)
+    return asyncio.run(bus.run(replayed_ticks(zip(bid.tolist(), ask.tolist(), times), FastClock())))
+
+
+@benchmark('portfolio_mark_to_market', 'positions/s')
+def bench_portfolio(size, n_ticks=100):
+    bid, ask, _ = sample_ticks(n_ticks)
+    portfolio = Portfolio(size)
+    accounts = portfolio.add_accounts(np.full(size // 10, 1e12))
+    portfolio.open_many(np.repeat(accounts, 10), np.tile(['long', 'short'], size // 2), 1000, bid[0], ask[0])
+    for b, a in zip(bid.tolist(), ask.tolist()):
+        portfolio.mark_to_market(b, a)
+    return n_ticks * len(portfolio.open_positions)
+
+
+@benchmark('liquidation_sweep', 'ticks/s')
+def bench_liquidation(size, n_accounts=100):
+    bid, ask, times = sample_ticks(size)
+    portfolio = Portfolio(n_accounts)
+    portfolio.add_accounts(np.full(n_accounts, 1e12))
+    portfolio.open_many(np.arange(n_accounts), 'long', 1000, bid[0], ask[0])
+    liquidator = Liquidator(portfolio)
+    for b, a, t in zip(bid.tolist(), ask.tolist(), times):
+        liquidator.sweep(b, a, t)
+    return size
+
+
+@benchmark('liquidation_sweep_1k', 'ticks/s')
+def bench_liquidation_1k(size):
+    return bench_liquidation(size // 10, 1000)
+
+
+@benchmark('liquidation_sweep_10k', 'ticks/s')
+def bench_liquidation_10k(size):
+    return bench_liquidation(size // 100, 10000)
+
+
+@benchmark('order_book_match', 'ticks/s')
+def bench_order_book(size, n_orders=10000):
+    bid, ask, _ = sample_ticks(size)
+    rng = np.random.default_rng(0)
+    book = OrderBook()
+    for i, price in enumerate(rng.uniform(0.5, 2.0, n_orders).tolist()):
+        book.place(0, 'long' if i % 2 else 'short', LIMIT if i % 4 < 2 else STOP, price, 1000)
+    for b, a in zip(bid.tolist(), ask.tolist()):
+        book.match(b, a)
+    return size
+
+
+@benchmark('indicators_incremental', 'candles/s')
+def bench_indicators_incremental(size):
+    bid, ask, times = sample_ticks(size)
+    builder = CandleBuilder(1)
+    indicators = IndicatorSet({'sma': SMA(20), 'ema': EMA(20), 'bollinger': Bollinger(20), 'rsi': RSI(14),
+                               'atr': ATR(14), 'vwap': VWAP()})
+    for b, a, t, s in zip(bid.tolist(), ask.tolist(), times, range(size)):
+        candle = builder.update(b, a, t, s)
+        if candle is not None:
+            indicators.update(candle)
+    return size - 1
+
+
+@benchmark('indicators_vectorized', 'candles/s')
+def bench_indicators_vectorized(size):
+    _, close, _ = sample_ticks(size)
+    high = close + 0.001
+    low = close - 0.001
+    ema(close, 20)
+    bollinger(close, 20)
+    rsi(close, 14)
+    atr(high, low, close, 14)
+    vwap((high + low + close) / 3)
+    return size
+
+
+@benchmark('journal', 'ticks/s')
+def bench_journal(size):
+    bid, ask, times = sample_ticks(size)
+    account = Account(1e12)
+    journal = Journal()
+    account.on_tick(bid[0], ask[0], times[0])
+    account.open_position('long', 1000)
+    engine_run(account, zip(bid.tolist(), ask.tolist(), times), journal)
+    journal.stats()
+    return size
+
+
+@benchmark('backtest', 'ticks/s')
+def bench_backtest(size):
+    from backtest import generated_feed, run_backtest
+    from strategies import MovingAverageCross
+
+    bid, ask, times = generated_feed(size, seed=0)
+    run_backtest(MovingAverageCross(fast=5, slow=30, stop_loss=50), bid, ask, times)
+    return size
+
+
+# Legacy baselines: the full-page Plotly render and the QTableWidget status table that the GUI used before
+# chart.LiveChart and models.StatusTableModel, kept here only to measure the new paths against.
+
+def legacy_candlestick_html(candlesticks, fig):
+    """
+    Redraws every candle into a figure and renders it to a standalone HTML div.
+    """
+    import pandas as pd
+    from plotly.offline import plot
+
+    df = pd.DataFrame(candlesticks, columns=['time', 'open', 'close', 'high', 'low'])
+    fig.update_traces(x=df['time'], open=df['open'], high=df['high'], low=df['low'], close=df['close'])
+    fig.update_layout(title='Candlestick Chart', xaxis_rangeslider_visible=False, xaxis=dict(tickformat="%H:%M:%S"))
+    return plot(fig, output_type='div', include_plotlyjs='cdn')
+
+
+def legacy_load_dataframe(df, table):
+    """
+    Rebuilds a QTableWidget cell by cell from a DataFrame.
+    """
+    from PyQt5.QtWidgets import QTableWidgetItem
+
+    table.clear()
+    table.setRowCount(len(df))
+    table.setColumnCount(len(df.columns))
+    table.setHorizontalHeaderLabels(df.columns)
+    for row in range(len(df)):
+        for col in range(len(df.columns)):
+            table.setItem(row, col, QTableWidgetItem(str(df.iat[row, col])))
+
+
+@benchmark('candlestick_chart_html', 'renders/s')
+def bench_chart_html(size, n_candles=200):
+    import plotly.graph_objects as go
+
+    bid, ask, times = sample_ticks(n_candles)
+    candles = [(t, a, a, a + 0.001, a - 0.001) for a, t in zip(ask.tolist(), times)]
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(x=[], open=[], high=[], low=[], close=[]))
+    renders = max(size // 10000, 1)
+    for _ in range(renders):
+        legacy_candlestick_html(candles, fig)
+    return renders
+
+
+class SkipBenchmark(Exception):
+    """
+    Raised by a benchmark that cannot run in this environment.
+    """
+
+
+class StubWebView:
+    """
+    Stands in for a QWebEngineView: the page loads at once and scripts are collected instead of run.
+    """
+
+    class Signal:
+        def connect(self, slot):
+            self.slot = slot
+
+    def __init__(self):
+        self.loadFinished = self.Signal()
+        self.scripts = []
+
+    def setHtml(self, html):
+        self.loadFinished.slot(True)
+
+    def page(self):
+        return self
+
+    def runJavaScript(self, script, *args):
+        self.scripts.append(script)
+
+
+def chart_frames(size, timeframe=30):
+    """
+    Yields the (candles, overlay points) of every tick of a seeded feed, as MainWindow.refresh sends them.
+    """
+    bid, ask, times = sample_ticks(size)
+    builder = CandleBuilder(timeframe)
+    indicators = IndicatorSet({'ema': EMA(20), 'rsi': RSI(14)})
+    for b, a, t, s in zip(bid.tolist(), ask.tolist(), times, range(size)):
+        closed = builder.update(b, a, t, s)
+        candles = [builder.current.as_tuple()]
+        points = {}
+        if closed is not None:
+            candles.insert(0, closed.as_tuple())
+            points = {name: [(closed.time, value)] for name, value in indicators.update(closed).items()
+                      if value is not None}
+        yield candles, points
+
+
+@benchmark('live_chart_scripts', 'updates/s')
+def bench_live_chart_scripts(size):
+    # Script generation only: the scripts are not run by a browser
+    from chart import LiveChart
+
+    chart = LiveChart(StubWebView())
+    for name, axis in (('ema', 'y'), ('rsi', 'y2')):
+        chart.add_overlay(name, axis)
+    for candles, points in chart_frames(size):
+        chart.update(candles)
+        chart.update_overlays(points)
+    return size
+
+
+@benchmark('live_chart_latency', 'updates/s')
+def bench_live_chart_latency(size, timeout=30):
+    """
+    Times LiveChart updates drawn by an offscreen QWebEngineView, from the update call until the page has run
+    the update scripts. Needs the Plotly script of the chart page to load; skipped if the page takes more
+    than `timeout` seconds to load or to run the updates.
+    """
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtWebEngineWidgets import QWebEngineView
+    from chart import LiveChart
+
+    app = QApplication.instance() or QApplication([])
+    view = QWebEngineView()
+    chart = LiveChart(view)
+    deadline = time.perf_counter() + timeout
+    while not chart._ready and time.perf_counter() < deadline:
+        app.processEvents()
+    done = []
+    view.page().runJavaScript("typeof Plotly", done.append)
+    while not done and time.perf_counter() < deadline:
+        app.processEvents()
+    if done != ['object']:
+        raise SkipBenchmark("the chart page did not load Plotly")
+    for name, axis in (('ema', 'y'), ('rsi', 'y2')):
+        chart.add_overlay(name, axis)
+
+    deadline = time.perf_counter() + timeout
+    latencies = []
+    frames = itertools.islice(chart_frames(size), max(size // 100, 1))
+    for candles, points in frames:
+        done = []
+        start = time.perf_counter()
+        chart.update(candles)
+        chart.update_overlays(points)
+        # Scripts run in order, so this one returns once the update has been drawn
+        view.page().runJavaScript("0", done.append)
+        while not done and time.perf_counter() < deadline:
+            app.processEvents()
+        if not done:
+            raise SkipBenchmark("the chart page stopped answering")
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return len(latencies), {'latency_ms': dict(zip(['p50', 'p95', 'max'],
+                                                   np.percentile(latencies, [50, 95, 100]).tolist()))}
+
+
+@benchmark('load_dataframe', 'rows/s')
+def bench_load_dataframe(size, n_rows=200):
+    import pandas as pd
+    from PyQt5.QtWidgets import QApplication, QTableWidget
+    from engine import STATUS_COLUMNS
+
+    app = QApplication.instance() or QApplication([])
+    table = QTableWidget()
+    df = pd.DataFrame([['$1.00'] * len(STATUS_COLUMNS)] * n_rows, columns=STATUS_COLUMNS)
+    loads = max(size // 10000, 1)
+    for _ in range(loads):
+        legacy_load_dataframe(df, table)
+    return loads * n_rows
+
+
+@benchmark('status_table_model', 'rows/s')
+def bench_status_model(size):
+    from PyQt5.QtWidgets import QApplication, QTableView
+    from models import StatusTableModel
+    from engine import STATUS_COLUMNS
+    from utility import format_currency
+
+    app = QApplication.instance() or QApplication([])
+    model = StatusTableModel(STATUS_COLUMNS, formatters=[format_currency] * len(STATUS_COLUMNS))
+    view = QTableView()
+    view.setModel(model)
+    row = [1.0] * len(STATUS_COLUMNS)
+    for _ in range(size // 10):
+        model.set_live_row(row)
+        model.append_row(row)
+    return size // 10 * 2
+
+
+def run(names, size, repeat):
+    """
+    Runs the selected benchmarks and returns their results.
+    """
+    results = {}
+    for name in names:
+        function, unit = BENCHMARKS[name]
+        best = None
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                count = function(size)
+                elapsed = time.perf_counter() - start
+                # A benchmark may also return extra figures, such as latency percentiles
+                extra = {}
+                if isinstance(count, tuple):
+                    count, extra = count
+                if best is None or elapsed < best[1]:
+                    best = (count, elapsed, extra)
+        except (ImportError, SkipBenchmark) as e:
+            results[name] = {'skipped': str(e)}
+            continue
+        count, elapsed, extra = best
+        results[name] = {'rate': count / elapsed, 'unit': unit, 'count': count, 'seconds': elapsed, **extra}
+    return results
+
+
+def environment():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+    return {'revision': revision, 'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'time': datetime.now().isoformat(timespec='seconds')}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the change of every rate against a baseline and returns the names of the regressed benchmarks.
+    """
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get('results', {}).get(name, {})
+        if 'rate' not in result or 'rate' not in old:
+            continue
+        ratio = result['rate'] / old['rate']
+        flag = ''
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:28s} {ratio:8.2f}x{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the simulator's hot paths")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--size', type=int, default=100000, help="number of ticks per benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="report the best of this many runs")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="slowdown ratio reported as a regression by --compare")
+    args = parser.parse_args()
+
+    report = {'environment': environment(), 'size': args.size,
+              'results': run(args.only or list(BENCHMARKS), args.size, args.repeat)}
+    for name, result in report['results'].items():
+        if 'skipped' in result:
+            print(f"{name:28s} skipped ({result['skipped']})")
+        else:
+            latency = result.get('latency_ms')
+            latency = f"  (latency p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms)" if latency else ''
+            print(f"{name:28s} {result['rate']:16,.0f} {result['unit']}{latency}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report['results'], baseline, args.tolerance):
+            sys.exit(1)
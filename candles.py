@@ -0,0 +1,158 @@
+"""
+Streaming OHLC candle aggregation.
+
+Candles are updated in place on every tick, so closing a candle costs O(1) no matter how many ticks
+it holds, and only the last `maxlen` finished candles of every timeframe are kept in memory.
+"""
+
+from collections import deque
+from datetime import datetime
+
+
+class Candle:
+    """
+    Bid and ask open/high/low/close prices and tick volume of one time bucket.
+    """
+
+    __slots__ = ('time', 'end_time', 'bid_open', 'bid_high', 'bid_low', 'bid_close',
+                 'ask_open', 'ask_high', 'ask_low', 'ask_close', 'volume')
+
+    def __init__(self, time, bid_price, ask_price, end_time=None):
+        self.time = time
+        self.end_time = end_time
+        self.bid_open = self.bid_high = self.bid_low = self.bid_close = bid_price
+        self.ask_open = self.ask_high = self.ask_low = self.ask_close = ask_price
+        self.volume = 1
+
+    def update(self, bid_price, ask_price, end_time=None):
+        """
+        Adds a tick to the candle.
+        """
+        if bid_price > self.bid_high:
+            self.bid_high = bid_price
+        elif bid_price < self.bid_low:
+            self.bid_low = bid_price
+        if ask_price > self.ask_high:
+            self.ask_high = ask_price
+        elif ask_price < self.ask_low:
+            self.ask_low = ask_price
+        self.bid_close = bid_price
+        self.ask_close = ask_price
+        self.end_time = end_time
+        self.volume += 1
+
+    def as_tuple(self, side='ask'):
+        """
+        Returns the candle as a (time, open, close, high, low) tuple, the format used by the charts.
+
+        Args:
+            side (str): 'ask' or 'bid'.
+        """
+        if side == 'ask':
+            return (self.time, self.ask_open, self.ask_close, self.ask_high, self.ask_low)
+        return (self.time, self.bid_open, self.bid_close, self.bid_high, self.bid_low)
+
+    def __repr__(self):
+        return (f"Candle({self.time}, bid={self.bid_open}/{self.bid_high}/{self.bid_low}/{self.bid_close}, "
+                f"ask={self.ask_open}/{self.ask_high}/{self.ask_low}/{self.ask_close}, volume={self.volume})")
+
+
+class CandleBuilder:
+    """
+    Builds candles of a single timeframe from a tick stream.
+
+    Buckets are aligned on multiples of `timeframe` seconds counted from `origin` (the epoch by default).
+    A candle is closed by the first tick that falls in a later bucket.
+    """
+
+    def __init__(self, timeframe, maxlen=1000, origin=0):
+        self.timeframe = timeframe
+        self.origin = origin
+        self.candles = deque(maxlen=maxlen)
+        self.current = None
+        self._bucket = None
+
+    def update(self, bid_price, ask_price, price_time, timestamp=None):
+        """
+        Adds a tick to the current candle.
+
+        Args:
+            bid_price (float): The bid price of the tick.
+            ask_price (float): The ask price of the tick.
+            price_time (datetime): The time of the tick.
+            timestamp (float): The time of the tick in seconds since the epoch, computed from
+                               price_time when omitted.
+
+        Returns:
+            Candle: The candle closed by this tick, or None.
+        """
+        if timestamp is None:
+            timestamp = price_time.timestamp()
+        bucket = (timestamp - self.origin) // self.timeframe
+        if bucket == self._bucket:
+            self.current.update(bid_price, ask_price, price_time)
+            return None
+
+        closed = self.current
+        if closed is not None:
+            self.candles.append(closed)
+        self._bucket = bucket
+        start = datetime.fromtimestamp(self.origin + bucket * self.timeframe)
+        self.current = Candle(start, bid_price, ask_price, price_time)
+        return closed
+
+    def flush(self):
+        """
+        Closes the current candle without waiting for the next bucket.
+
+        Returns:
+            Candle: The closed candle, or None if there is no open candle.
+        """
+        closed = self.current
+        if closed is not None:
+            self.candles.append(closed)
+        self.current = None
+        self._bucket = None
+        return closed
+
+
+class MultiCandleBuilder:
+    """
+    Builds candles of several timeframes at once from the same tick stream.
+    """
+
+    def __init__(self, timeframes=(5, 30, 60, 300), maxlen=1000, origin=0):
+        self.builders = {timeframe: CandleBuilder(timeframe, maxlen, origin) for timeframe in timeframes}
+
+    def __getitem__(self, timeframe):
+        return self.builders[timeframe]
+
+    def update(self, bid_price, ask_price, price_time, timestamp=None):
+        """
+        Adds a tick to every timeframe.
+
+        Returns:
+            list: (timeframe, candle) tuples for the candles closed by this tick.
+        """
+        if timestamp is None:
+            timestamp = price_time.timestamp()
+        closed = []
+        for timeframe, builder in self.builders.items():
+            candle = builder.update(bid_price, ask_price, price_time, timestamp)
+            if candle is not None:
+                closed.append((timeframe, candle))
+        return closed
+
+    def flush(self):
+        """
+        Closes the current candle of every timeframe.
+
+        Returns:
+            list: (timeframe, candle) tuples for the closed candles.
+        """
+        closed = []
+        for timeframe, builder in self.builders.items():
+            candle = builder.flush()
+            if candle is not None:
+                closed.append((timeframe, candle))
+        return closed
@@ -0,0 +1,187 @@
+"""
+Persistent Plotly chart page updated incrementally from Python.
+
+The page is loaded once into a QWebEngineView; afterwards only new or changed candles are sent to it
+through runJavaScript and drawn with Plotly.extendTraces, keeping at most `window` candles on screen.
+The page holds a candlestick and a line trace, so switching views only toggles their visibility.
+Indicator overlays are extra line traces, on the price axis or on a right-hand axis for oscillators,
+extended with the value of every closed candle.
+"""
+
+import json
+
+CHART_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
+<style>html, body, #chart {{ width: 100%; height: 100%; margin: 0; }}</style>
+</head>
+<body>
+<div id="chart"></div>
+<script>
+var chart = document.getElementById('chart');
+var maxPoints = {window};
+var titles = {{candle: ['Candlestick Chart', 'Price'], line: ['Line Chart', 'Close Price']}};
+var overlays = {{}};
+
+Plotly.newPlot(chart, [
+    {{type: 'candlestick', x: [], open: [], high: [], low: [], close: [], name: 'Price'}},
+    {{type: 'scatter', mode: 'lines', x: [], y: [], name: 'Close Price'}}
+], {{
+    xaxis: {{type: 'date', title: {{text: 'Time'}}, tickformat: '%H:%M:%S', rangeslider: {{visible: false}}}},
+    yaxis: {{title: {{text: 'Price'}}}},
+    yaxis2: {{overlaying: 'y', side: 'right', showgrid: false, visible: false}},
+    showlegend: false
+}}, {{responsive: true}});
+
+function appendCandles(candles) {{
+    var x = [], open = [], close = [], high = [], low = [];
+    candles.forEach(function (c) {{ x.push(c[0]); open.push(c[1]); close.push(c[2]); high.push(c[3]); low.push(c[4]); }});
+    Plotly.extendTraces(chart, {{x: [x], open: [open], high: [high], low: [low], close: [close]}}, [0], maxPoints);
+    Plotly.extendTraces(chart, {{x: [x], y: [close]}}, [1], maxPoints);
+}}
+
+function updateLastCandle(c) {{
+    var candle = chart.data[0], line = chart.data[1], last = candle.x.length - 1;
+    candle.open[last] = c[1]; candle.close[last] = c[2]; candle.high[last] = c[3]; candle.low[last] = c[4];
+    line.y[last] = c[2];
+    Plotly.redraw(chart);
+}}
+
+function setView(view) {{
+    Plotly.update(chart, {{visible: [view === 'candle', view === 'line']}},
+                  {{title: {{text: titles[view][0]}}, 'yaxis.title.text': titles[view][1]}}, [0, 1]);
+}}
+
+function addOverlay(name, axis) {{
+    overlays[name] = chart.data.length;
+    Plotly.addTraces(chart, {{type: 'scatter', mode: 'lines', x: [], y: [], name: name, yaxis: axis,
+                             line: {{width: 1}}}});
+    if (axis === 'y2') {{
+        Plotly.relayout(chart, {{'yaxis2.visible': true}});
+    }}
+}}
+
+function extendOverlays(points) {{
+    var x = [], y = [], traces = [];
+    Object.keys(points).forEach(function (name) {{
+        traces.push(overlays[name]);
+        x.push(points[name].map(function (p) {{ return p[0]; }}));
+        y.push(points[name].map(function (p) {{ return p[1]; }}));
+    }});
+    if (traces.length) {{
+        Plotly.extendTraces(chart, {{x: x, y: y}}, traces, maxPoints);
+    }}
+}}
+
+setView('{view}');
+</script>
+</body>
+</html>
+"""
+
+
+def chart_page(window=200, view='candle'):
+    """
+    Returns the HTML of the chart page.
+
+    Args:
+        window (int): The maximum number of candles kept on the chart.
+        view (str): The initial view, 'candle' or 'line'.
+    """
+    return CHART_PAGE.format(window=int(window), view=view)
+
+
+def candle_json(candle):
+    """
+    Serializes a (time, open, close, high, low) tuple for the chart page.
+    """
+    candle_time = candle[0]
+    if hasattr(candle_time, 'isoformat'):
+        candle_time = candle_time.isoformat(sep=' ')
+    return [str(candle_time)] + [float(value) for value in candle[1:5]]
+
+
+class LiveChart:
+    """
+    Python side of the chart page.
+
+    Scripts issued before the page has finished loading are queued and run once it is ready.
+    """
+
+    def __init__(self, web_view, window=200, view='candle'):
+        self.web_view = web_view
+        self.window = window
+        self.view = view
+        self.last_time = None
+        self.overlays = {}
+        self._ready = False
+        self._pending = []
+        web_view.loadFinished.connect(self._on_load)
+        web_view.setHtml(chart_page(window, view))
+
+    def _on_load(self, ok):
+        self._ready = ok
+        pending, self._pending = self._pending, []
+        for script in pending:
+            self._run(script)
+
+    def _run(self, script):
+        if self._ready:
+            self.web_view.page().runJavaScript(script)
+        else:
+            self._pending.append(script)
+
+    def update(self, candles):
+        """
+        Sends new or changed candles to the chart.
+
+        A candle with the same time as the last one sent replaces it; later candles are appended.
+
+        Args:
+            candles (list): (time, open, close, high, low) tuples in time order.
+        """
+        new = []
+        for candle in candles:
+            if candle[0] == self.last_time and not new:
+                self._run(f"updateLastCandle({json.dumps(candle_json(candle))});")
+            else:
+                new.append(candle_json(candle))
+            self.last_time = candle[0]
+        if new:
+            self._run(f"appendCandles({json.dumps(new)});")
+
+    def add_overlay(self, name, axis='y'):
+        """
+        Adds an indicator line to the chart.
+
+        Args:
+            name (str): The name of the series.
+            axis (str): 'y' to draw on the price axis, 'y2' on the right-hand axis.
+        """
+        if name in self.overlays:
+            return
+        self.overlays[name] = axis
+        self._run(f"addOverlay({json.dumps(name)}, {json.dumps(axis)});")
+
+    def update_overlays(self, points):
+        """
+        Appends indicator values to their lines.
+
+        Args:
+            points (dict): (time, value) lists by series name, as produced by indicators.IndicatorSet.
+        """
+        series = {}
+        for name, values in points.items():
+            if values:
+                series[name] = [[candle_json((time, 0, 0, 0, 0))[0], float(value)] for time, value in values]
+        if series:
+            self._run(f"extendOverlays({json.dumps(series)});")
+
+    def set_view(self, view):
+        """
+        Switches between the 'candle' and 'line' views without reloading the page.
+        """
+        self.view = view
+        self._run(f"setView({json.dumps(view)});")
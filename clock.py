@@ -0,0 +1,117 @@
+"""
+Clocks used to pace the price feed and to timestamp ticks.
+
+A RealTimeClock follows the wall clock, a ScaledClock runs N times faster than the wall clock and
+a FastClock never sleeps: waiting on it just moves its simulated time forward, so a whole trading
+session can be replayed as fast as the consumers can keep up while producing the same timestamps.
+
+wait() paces a feed running in its own thread; the coroutine sleep() paces a feed running on an asyncio loop.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+
+class RealTimeClock:
+    """
+    Clock that follows the wall clock.
+    """
+
+    def time(self):
+        """
+        Returns the current time in seconds since the epoch.
+        """
+        return time.time()
+
+    def now(self):
+        """
+        Returns the current time as a datetime.
+        """
+        return datetime.fromtimestamp(self.time())
+
+    def wait(self, event, seconds):
+        """
+        Waits for the given number of clock seconds or until the event is set.
+
+        Args:
+            event (Event): An event that interrupts the wait when set.
+            seconds (float): The number of clock seconds to wait.
+
+        Returns:
+            bool: True if the event is set.
+        """
+        return event.wait(seconds)
+
+    async def sleep(self, seconds):
+        """
+        Sleeps for the given number of clock seconds without blocking the event loop.
+        """
+        await asyncio.sleep(seconds)
+
+
+class ScaledClock(RealTimeClock):
+    """
+    Clock that runs `factor` times faster than the wall clock, starting at `start`.
+    """
+
+    def __init__(self, factor, start=None):
+        if factor <= 0:
+            raise ValueError("factor must be positive")
+        self.factor = factor
+        self.start = time.time() if start is None else start
+        self._real_start = time.time()
+
+    def time(self):
+        return self.start + (time.time() - self._real_start) * self.factor
+
+    def wait(self, event, seconds):
+        return event.wait(seconds / self.factor)
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds / self.factor)
+
+
+class FastClock(RealTimeClock):
+    """
+    Unthrottled clock: waiting returns immediately and advances the simulated time instead.
+    """
+
+    def __init__(self, start=None):
+        self._now = time.time() if start is None else start
+        self._lock = threading.Lock()
+
+    def time(self):
+        return self._now
+
+    def wait(self, event, seconds):
+        with self._lock:
+            self._now += seconds
+        return event.is_set()
+
+    async def sleep(self, seconds):
+        with self._lock:
+            self._now += seconds
+        # Still yield, so that other feeds and consumers on the loop get their turn
+        await asyncio.sleep(0)
+
+
+def make_clock(speed=1, start=None):
+    """
+    Creates a clock for the requested replay speed.
+
+    Args:
+        speed (float): 1 for real time, N for a clock N times faster than real time,
+                       0 for an unthrottled clock.
+        start (float): Starting time of a simulated clock in seconds since the epoch, e.g. to resume a
+                       snapshot; the real-time clock always follows the wall clock.
+
+    Returns:
+        RealTimeClock: The clock.
+    """
+    if speed == 0:
+        return FastClock(start)
+    if speed == 1:
+        return RealTimeClock()
+    return ScaledClock(speed, start)
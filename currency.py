@@ -0,0 +1,115 @@
+"""
+Currency pairs and conversion of P/L and margin into the account currency.
+"""
+
+import numpy as np
+
+ACCOUNT_CURRENCY = 'USD'
+CURRENCY_ALIASES = {'euro': 'EUR', 'dollar': 'USD', 'pound': 'GBP', 'yen': 'JPY'}
+
+
+def currency_code(name):
+    """
+    Returns the ISO code of a currency, accepting the long names used by the GUI ('euro', 'usd').
+    """
+    return CURRENCY_ALIASES.get(name.lower(), name.upper())
+
+
+def split_pair(symbol):
+    """
+    Splits a pair such as 'EUR/USD' (or 'EURUSD') into its base and quote currencies.
+    """
+    if '/' in symbol:
+        base, quote = symbol.split('/')
+    else:
+        base, quote = symbol[:3], symbol[3:]
+    return currency_code(base), currency_code(quote)
+
+
+def quote_to_account(base_curr, quote_curr, bid_price, ask_price, account_currency=ACCOUNT_CURRENCY):
+    """
+    Returns the value in the account currency of one unit of a pair's quote currency, using only that pair.
+
+    Raises:
+        ValueError: If neither currency of the pair is the account currency; use CrossRates for those.
+    """
+    base, quote = currency_code(base_curr), currency_code(quote_curr)
+    account_currency = currency_code(account_currency)
+    if quote == account_currency:
+        return 1.0
+    if base == account_currency:
+        return 2 / (bid_price + ask_price)
+    raise ValueError(f"No conversion from {quote} to {account_currency} with {base}/{quote} alone")
+
+
+class CrossRates:
+    """
+    Conversion of every pair's base and quote currency into the account currency from the pairs' mid prices.
+
+    A currency converts directly when it is traded against the account currency (in either direction), or
+    through one intermediate currency otherwise. Conversion paths are resolved once; converting is then two
+    gathers and two powers over the array of mid prices.
+    """
+
+    def __init__(self, symbols, account_currency=ACCOUNT_CURRENCY):
+        self.symbols = list(symbols)
+        self.account_currency = currency_code(account_currency)
+        self.pairs = [split_pair(symbol) for symbol in self.symbols]
+        self._quotes = self._paths([quote for _, quote in self.pairs])
+        self._bases = self._paths([base for base, _ in self.pairs])
+
+    def _hop(self, source, target):
+        # Rate that converts one unit of source into target, as (pair index, power)
+        for index, (base, quote) in enumerate(self.pairs):
+            if base == source and quote == target:
+                return index, 1.0
+            if base == target and quote == source:
+                return index, -1.0
+        return None
+
+    def path(self, currency):
+        """
+        Returns the conversion path of a currency into the account currency as up to two (pair, power) hops.
+        """
+        currency = currency_code(currency)
+        if currency == self.account_currency:
+            return []
+        direct = self._hop(currency, self.account_currency)
+        if direct is not None:
+            return [direct]
+        currencies = {c for pair in self.pairs for c in pair}
+        for middle in sorted(currencies - {currency, self.account_currency}):
+            first = self._hop(currency, middle)
+            second = self._hop(middle, self.account_currency)
+            if first is not None and second is not None:
+                return [first, second]
+        raise ValueError(f"No conversion from {currency} to {self.account_currency} with pairs {self.symbols}")
+
+    def _paths(self, currencies):
+        index = np.zeros((2, len(currencies)), dtype=np.int64)
+        power = np.zeros((2, len(currencies)))
+        for column, currency in enumerate(currencies):
+            for hop, (pair, exponent) in enumerate(self.path(currency)):
+                index[hop, column] = pair
+                power[hop, column] = exponent
+        return index, power
+
+    @staticmethod
+    def _convert(paths, mids):
+        index, power = paths
+        return np.power(mids[index[0]], power[0]) * np.power(mids[index[1]], power[1])
+
+    def quote_to_account(self, mids):
+        """
+        Returns, for every pair, the value in the account currency of one unit of its quote currency.
+
+        Args:
+            mids (numpy.ndarray): The mid price of every pair.
+        """
+        return self._convert(self._quotes, np.asarray(mids, dtype=np.float64))
+
+    def base_to_account(self, mids):
+        """
+        Returns, for every pair, the value in the account currency of one unit of its base currency.
+        """
+        return self._convert(self._bases, np.asarray(mids, dtype=np.float64))
@@ -0,0 +1,300 @@
+"""
+Headless trading engine for the Forex simulator.
+
+Holds the account, position, margin and stop-out logic without any dependency on PyQt5 or plotly,
+so it can be driven by a plain tick feed on a server as well as by the GUI in forex_simulator.py.
+"""
+
+import logging
+
+from currency import ACCOUNT_CURRENCY, quote_to_account
+from utility import format_currency
+
+logger = logging.getLogger(__name__)
+
+PIP = 0.0001
+MARGIN_RATE = 0.2
+MARGIN_CALL_LEVEL = 100
+STOP_OUT_LEVEL = 50
+STATUS_COLUMNS = ['Balance', 'Equity', 'Float_PL', 'Used_Margin', 'Free_Margin', 'Margin_Level', 'Realized_PL']
+
+
+class TradeError(Exception):
+    """
+    Raised when a trading operation is rejected; the message is meant to be shown to the user.
+    """
+
+
+def margin_cal(mode, base_curr, quote_curr, bid_price, ask_price, units_to_trade, margin_rate=MARGIN_RATE):
+    """
+    Calculates the required margin and position value for a given trade.
+
+    Args:
+        mode (str): The type of trade ('long' or 'short').
+        base_curr (str): The base currency of the trade.
+        quote_curr (str): The quote currency of the trade.
+        bid_price (float): The current bid price of the currency pair.
+        ask_price (float): The current ask price of the currency pair.
+        units_to_trade (float): The number of units to trade.
+        margin_rate (float): The fraction of the position value required as margin.
+
+    Returns:
+        tuple: The calculated margin and the total position value.
+    """
+    if mode == 'long':
+        exchange_rate = ask_price
+    elif mode == 'short':
+        exchange_rate = bid_price
+
+    if base_curr.lower() != 'usd':
+        position_value = exchange_rate * units_to_trade
+    else:
+        position_value = units_to_trade
+    margin = margin_rate * position_value
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Position Value : %s", format_currency(position_value))
+        logger.debug("Used Margin : %s for %s %% of position size", format_currency(margin), margin_rate * 100)
+    return margin, position_value
+
+
+def float_pl_cal(mode, enter_bid_price, enter_ask_price, bid_price, ask_price, units_to_trade):
+    """
+    Calculates the floating profit/loss of an open position.
+
+    Args:
+        mode (str): The type of trade ('long' or 'short').
+        enter_bid_price (float): The bid price when the position was opened.
+        enter_ask_price (float): The ask price when the position was opened.
+        bid_price (float): The current bid price of the currency pair.
+        ask_price (float): The current ask price of the currency pair.
+        units_to_trade (float): The number of units traded.
+
+    Returns:
+        float: The floating profit/loss in the quote currency.
+    """
+    profit = -1
+    if mode == 'long':
+        bid_ask_price_diff = bid_price - enter_ask_price
+        if bid_ask_price_diff > 0:
+            profit = 1
+    else:
+        bid_ask_price_diff = ask_price - enter_bid_price
+        if bid_ask_price_diff < 0:
+            profit = 1
+
+    # Calculate price difference in pips
+    bid_ask_price_diff_pips = round(bid_ask_price_diff * 10000, 4)
+    return profit * abs(bid_ask_price_diff_pips) * PIP * units_to_trade
+
+
+class Position:
+    """
+    A single open or closed market position.
+    """
+
+    def __init__(self, mode, units_to_trade, enter_bid_price, enter_ask_price,
+                 base_curr='euro', quote_curr='usd', enter_time=None):
+        self.mode = mode
+        self.units_to_trade = units_to_trade
+        self.enter_bid_price = enter_bid_price
+        self.enter_ask_price = enter_ask_price
+        self.base_curr = base_curr
+        self.quote_curr = quote_curr
+        self.enter_time = enter_time
+        self.exit_bid_price = None
+        self.exit_ask_price = None
+        self.exit_time = None
+        self.realized_pl = None
+        self.used_margin = None
+        self.margin_level = None
+
+    @property
+    def enter_price(self):
+        return self.enter_ask_price if self.mode == 'long' else self.enter_bid_price
+
+    @property
+    def exit_price(self):
+        if self.exit_bid_price is None:
+            return None
+        return self.exit_bid_price if self.mode == 'long' else self.exit_ask_price
+
+
+class Account:
+    """
+    A trading account with at most one open position, driven by a plain tick feed.
+
+    Every call to on_tick marks the open position to market, refreshes equity, margin and margin level,
+    and liquidates the position once the margin level falls below the stop-out level.
+    """
+
+    def __init__(self, balance=0.0, margin_rate=MARGIN_RATE, account_currency=ACCOUNT_CURRENCY):
+        self.balance = balance
+        self.margin_rate = margin_rate
+        self.account_currency = account_currency
+        self.equity = balance
+        self.float_pl = 0
+        self.used_margin = 0
+        self.free_margin = balance
+        self.margin_level = 0
+        self.realize_PL = 0
+        self.position = None
+        self.last_closed = None
+        self.last_bid_price = None
+        self.last_ask_price = None
+        self.last_time = None
+
+    @property
+    def trade_in_progress(self):
+        return self.position is not None
+
+    def deposit(self, amount):
+        """
+        Sets the account balance to the given amount.
+
+        Args:
+            amount (float): The new balance.
+        """
+        if self.trade_in_progress:
+            raise TradeError("Trading in progress ...")
+        if amount < 0:
+            raise TradeError("Wrong Number !")
+        self.balance = amount
+        self.equity = amount
+        self.free_margin = amount
+
+    def open_position(self, mode, units_to_trade, base_curr='euro', quote_curr='usd'):
+        """
+        Opens a market position at the last known prices.
+
+        Args:
+            mode (str): The trade mode, either 'long' (buy) or 'short' (sell).
+            units_to_trade (float): The number of units involved in the trade.
+            base_curr (str): The base currency in the trade pair.
+            quote_curr (str): The quote currency in the trade pair.
+
+        Returns:
+            Position: The newly opened position.
+        """
+        if self.trade_in_progress:
+            raise TradeError("Trade in progress")
+        if self.last_ask_price is None:
+            raise TradeError("Waiting for new Price ...")
+        if units_to_trade <= 0:
+            raise TradeError("Wrong Number !")
+        try:
+            quote_to_account(base_curr, quote_curr, self.last_bid_price, self.last_ask_price, self.account_currency)
+        except ValueError as e:
+            raise TradeError(str(e))
+
+        margin, _ = margin_cal(mode, base_curr, quote_curr, self.last_bid_price, self.last_ask_price,
+                               units_to_trade, self.margin_rate)
+        if self.balance < margin:
+            raise TradeError("Not enough Funds !\n, Increase balance to at least " + format_currency(margin))
+
+        self.position = Position(mode, units_to_trade, self.last_bid_price, self.last_ask_price,
+                                 base_curr, quote_curr, self.last_time)
+        return self.position
+
+    def on_tick(self, bid_price, ask_price, price_time=None):
+        """
+        Feeds a new tick into the account and re-evaluates the open position.
+
+        Args:
+            bid_price (float): The new bid price.
+            ask_price (float): The new ask price.
+            price_time (datetime): The time of the tick.
+
+        Returns:
+            list: The events raised by this tick, 'margin_call' and/or 'stop_out'.
+                  On 'stop_out' the position has already been closed.
+        """
+        self.last_bid_price = bid_price
+        self.last_ask_price = ask_price
+        self.last_time = price_time
+        if not self.trade_in_progress:
+            return []
+        self.mark_to_market()
+
+        events = []
+        if self.margin_level < MARGIN_CALL_LEVEL:
+            events.append('margin_call')
+        if self.margin_level < STOP_OUT_LEVEL:
+            events.append('stop_out')
+            self.close_position()
+        return events
+
+    def mark_to_market(self):
+        """
+        Recomputes the floating P/L, equity and margin figures of the open position at the last prices.
+        """
+        position = self.position
+        to_account = quote_to_account(position.base_curr, position.quote_curr, self.last_bid_price,
+                                      self.last_ask_price, self.account_currency)
+        self.float_pl = float_pl_cal(position.mode, position.enter_bid_price, position.enter_ask_price,
+                                     self.last_bid_price, self.last_ask_price, position.units_to_trade) * to_account
+        self.equity = self.balance + self.float_pl
+        self.used_margin, _ = margin_cal(position.mode, position.base_curr, position.quote_curr,
+                                         self.last_bid_price, self.last_ask_price, position.units_to_trade,
+                                         self.margin_rate)
+        self.margin_level = abs(round(self.equity / self.used_margin * 100, 2))
+        self.free_margin = self.equity - self.used_margin
+        self.realize_PL = 0
+
+    def close_position(self):
+        """
+        Closes the open position at the last known prices and realizes its profit/loss.
+
+        Returns:
+            Position: The closed position.
+        """
+        if not self.trade_in_progress:
+            raise TradeError("No Trade in progress")
+        self.mark_to_market()
+
+        position = self.position
+        position.exit_bid_price = self.last_bid_price
+        position.exit_ask_price = self.last_ask_price
+        position.exit_time = self.last_time
+        position.realized_pl = self.float_pl
+        position.used_margin = self.used_margin
+        position.margin_level = self.margin_level
+
+        self.balance = self.equity
+        self.free_margin = self.equity
+        self.realize_PL = self.float_pl
+        self.used_margin = 0
+        self.float_pl = 0
+        self.margin_level = 0
+        self.position = None
+        self.last_closed = position
+        return position
+
+    def status(self):
+        """
+        Returns the current account figures in the order of STATUS_COLUMNS.
+        """
+        return [self.balance, self.equity, self.float_pl, self.used_margin,
+                self.free_margin, self.margin_level, self.realize_PL]
+
+
+def run(account, ticks, journal=None):
+    """
+    Drives an account with a plain tick feed.
+
+    Args:
+        account (Account): The account to update.
+        ticks (iterable): (bid, ask, time) tuples.
+        journal (Journal): If given, records the account figures at every tick and the stopped-out trades.
+
+    Returns:
+        list: (time, event) tuples for every margin call and stop-out raised by the feed.
+    """
+    log = []
+    for bid_price, ask_price, price_time in ticks:
+        for event in account.on_tick(bid_price, ask_price, price_time):
+            log.append((price_time, event))
+            if event == 'stop_out' and journal is not None:
+                journal.record_trade(account.last_closed, account.balance)
+        if journal is not None:
+            journal.record_equity(price_time, account.status())
+    return log
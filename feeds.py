@@ -0,0 +1,184 @@
+"""
+Asyncio price feeds.
+
+Price sources are async generators of (bid, ask, time) ticks paced by a clock's sleep(). A TickBus runs a
+source on the event loop and pushes every tick to its subscribers (engine, candle builder, UI, persistence)
+as soon as it is produced, so nothing polls a queue and nothing wakes up while no tick has arrived.
+Any number of buses can share one loop, headless with asyncio.run or under Qt through a qasync loop.
+"""
+
+import asyncio
+import inspect
+import logging
+
+from clock import RealTimeClock
+from metrics import METRICS
+from price import price_generator
+
+logger = logging.getLogger(__name__)
+
+
+async def generated_ticks(interval=5, clock=None, store=None, start=None):
+    """
+    Random-walk ticks from price.price_generator, one every `interval` clock seconds.
+
+    Args:
+        interval (int): Time interval (in clock seconds) between two ticks.
+        clock (RealTimeClock): The clock pacing and timestamping the ticks, defaults to the wall clock.
+        store (TickStore): If given, every generated tick is also appended to this store.
+        start (tuple): (bid, ask) prices to continue the walk from, e.g. after restoring a snapshot.
+    """
+    if clock is None:
+        clock = RealTimeClock()
+    if start is None:
+        # The first prices only seed the walk, like price_generator_thread with first_run=True
+        bid_price, ask_price, _ = price_generator(0, 0, True, clock)
+    else:
+        bid_price, ask_price = start
+    try:
+        while True:
+            await clock.sleep(interval)
+            bid_price, ask_price, price_time = price_generator(bid_price, ask_price, False, clock)
+            if store is not None:
+                store.append(bid_price, ask_price, price_time)
+            yield bid_price, ask_price, price_time
+    finally:
+        if store is not None:
+            store.flush()
+
+
+async def replayed_ticks(ticks, clock=None):
+    """
+    Recorded ticks keeping their original spacing on the given clock.
+
+    Args:
+        ticks (iterable): (bid, ask, time) tuples in time order, e.g. from replay.iter_ticks.
+        clock (RealTimeClock): The clock pacing the replay; a FastClock replays as fast as possible.
+    """
+    if clock is None:
+        clock = RealTimeClock()
+    last_time = None
+    for bid_price, ask_price, price_time in ticks:
+        if last_time is not None:
+            delay = (price_time - last_time).total_seconds()
+            if delay > 0:
+                await clock.sleep(delay)
+        yield bid_price, ask_price, price_time
+        last_time = price_time
+
+
+async def multi_symbol_ticks(feed, interval=5, clock=None):
+    """
+    (bids, asks, time) ticks of every pair of a multifeed.MultiSymbolFeed.
+    """
+    if clock is None:
+        clock = RealTimeClock()
+    while True:
+        bids, asks = feed.step()
+        yield bids, asks, clock.now()
+        await clock.sleep(interval)
+
+
+class TickBus:
+    """
+    Pushes the ticks of one source to its subscribers, in subscription order.
+
+    A subscriber is called as callback(bid, ask, time). A coroutine subscriber is awaited before the next
+    tick is read, which slows the source down to the pace of its slowest consumer instead of queueing
+    ticks without bound. A failing subscriber is logged and does not stop the others.
+    """
+
+    def __init__(self, name='ticks'):
+        self.name = name
+        self.subscribers = []
+        self.task = None
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    async def publish(self, tick):
+        for callback in self.subscribers:
+            try:
+                result = callback(*tick)
+                if inspect.isawaitable(result):
+                    await result
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Subscriber %r of %s failed", callback, self.name)
+
+    async def run(self, source):
+        """
+        Reads a source until it is exhausted or the bus is stopped.
+
+        Returns:
+            int: The number of ticks published.
+        """
+        published = 0
+        try:
+            async for tick in source:
+                with METRICS.timer(f'{self.name}_publish'):
+                    await self.publish(tick)
+                published += 1
+                METRICS.count(self.name)
+        finally:
+            await source.aclose()
+        return published
+
+    def start(self, source, loop=None):
+        """
+        Runs a source in a new task of the given (or the running) event loop.
+        """
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        self.task = loop.create_task(self.run(source))
+        return self.task
+
+    def stop(self):
+        """
+        Cancels the running source, if any.
+        """
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+
+class FrameScheduler:
+    """
+    Coalesces redraw requests: the first request after a quiet period draws straight away on the next loop
+    iteration, and requests arriving faster than `interval` seconds are merged into one draw.
+    """
+
+    def __init__(self, callback, interval, loop=None):
+        self.callback = callback
+        self.interval = interval
+        self.loop = loop
+        self._handle = None
+        self._last = None
+
+    def request(self):
+        if self._handle is not None:
+            return
+        loop = self.loop or asyncio.get_running_loop()
+        now = loop.time()
+        delay = 0 if self._last is None else self._last + self.interval - now
+        if delay > 0:
+            self._handle = loop.call_later(delay, self._draw)
+        else:
+            self._handle = loop.call_soon(self._draw)
+
+    def _draw(self):
+        self._handle = None
+        self._last = (self.loop or asyncio.get_running_loop()).time()
+        try:
+            self.callback()
+        except Exception:
+            logger.exception("Frame callback failed")
+
+    def cancel(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
@@ -13,28 +13,59 @@ The app is designed with a graphical user interface (GUI) built using PyQt5 and
 In order to run this script it's required to install the following libraries:
 1- pandas: For managing and processing trade history and data.
 2- PyQt5: For building the GUI components of the application.
-3- plotly: For generating candlestick and line charts for price visualization.
+3- plotly: The charts are drawn with Plotly.js, loaded once from the Plotly CDN.
+4- qasync (optional): Runs the price feed on an asyncio loop shared with Qt; without it, a feed thread is polled by a QTimer.
 
 """
 
+import os
 import sys
-import threading
 import time
-from queue import Queue, Empty
-import pandas as pd
-import plotly.graph_objects as go
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QTableWidgetItem, QButtonGroup, QRadioButton 
+import argparse
+import asyncio
+import logging
+import threading
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QTableView, QButtonGroup, QRadioButton, QLabel
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 from PyQt5.QtCore import QTimer
 from ui_main_window import Ui_MainWindow  
-from price import price_generator_thread, process_price
-from utility import update_candlestick_chart, is_float, format_currency
+from price import price_generator_thread
+from utility import is_float, format_currency, format_percent, drain_queue, StampedQueue
+from engine import Account, TradeError, STATUS_COLUMNS
+from clock import make_clock
+from candles import MultiCandleBuilder
+from chart import LiveChart
+from tickstore import TickStore, CandleStore
+from replay import iter_ticks, replay_thread
+from feeds import TickBus, FrameScheduler, generated_ticks, replayed_ticks
+from models import StatusTableModel
+from journal import Journal
+from snapshot import Snapshot
+from indicators import IndicatorSet, SMA, EMA, Bollinger, VWAP
+from metrics import METRICS
+
+CANDLE_INTERVAL = 30
+CANDLE_TIMEFRAMES = (5, 30, 60, 300)
+CHART_WINDOW = 200
+MARKET_SESSION = 500
+FRAME_INTERVAL = 100  # milliseconds between two UI refreshes
+MAX_TICKS_PER_FRAME = 10000
+MAX_QUEUE = 100000
+METRICS_EXPORT_INTERVAL = 5  # seconds between two metrics exports
+STATUS_FORMATTERS = [format_currency] * 5 + [format_percent, format_currency]
+
+
+def default_indicators():
+    return {'SMA 20': SMA(20), 'EMA 20': EMA(20), 'Bollinger 20': Bollinger(20), 'VWAP': VWAP()}
+
+logger = logging.getLogger(__name__)
 
 
 
 
 class MainWindow(QMainWindow, Ui_MainWindow):
-    def __init__(self):
+    def __init__(self, clock=None, chart_window=CHART_WINDOW, store_dir=None, replay_path=None, metrics_path=None,
+                 loop=None, journal_path=None, snapshot_path=None, snapshot=None):
         super().__init__()
         self.setupUi(self)
         self.make_center()
@@ -59,50 +90,108 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.btn_deposit.clicked.connect(self.deposit)
         self.btn_close.clicked.connect(self.close_trade)
 
-        # Initializing plotly figures
-        self.fig = go.Figure()
-        self.fig2 = go.Figure()
-        self.fig.add_trace(go.Candlestick(x=[], open=[], high=[], low=[], close=[]))
-        self.fig2.add_trace(go.Scatter(x=[], y=[], mode='lines', name='Close Price'))
-        self.fig.update_xaxes(type='date', title_text='Time')
-        self.fig2.update_xaxes(type='date', title_text='Time')
-        self.fig.update_yaxes(title_text='Price')
-        self.fig2.update_yaxes(title_text='Close Price')
-        self.fig.update_layout(title='Candlestick Chart', xaxis_rangeslider_visible=False)
+        # Chart page is loaded once and then updated with new candles only
+        self.chart = LiveChart(self.web_view, chart_window, 'candle')
+        self.radio_candle.toggled.connect(self.change_chart_view)
+
+        # Status table backed by an append-only model instead of a rebuilt QTableWidget
+        self.status_model = StatusTableModel(STATUS_COLUMNS, self, STATUS_FORMATTERS)
+        self.table_view = QTableView(self.table_status.parentWidget())
+        self.table_view.setModel(self.status_model)
+        status_layout = self.table_status.parentWidget().layout()
+        if status_layout is not None:
+            status_layout.replaceWidget(self.table_status, self.table_view)
+        else:
+            self.table_view.setGeometry(self.table_status.geometry())
+        self.table_status.hide()
+
+        # Optional live metrics panel below the status table
+        self.metrics_path = metrics_path
+        self.metrics_exported = time.time()
+        self.metrics_label = None
+        if METRICS.enabled:
+            self.metrics_label = QLabel(self.table_view.parentWidget())
+            if status_layout is not None:
+                status_layout.addWidget(self.metrics_label)
 
         # Initializing variables
-        self.trade_in_progress = False
-        self.last_ask_price = None
-        self.last_bid_price = None
-        self.balance = float(self.text_balance.toPlainText().replace("$", ''))
-        self.lable_balance.setText("Balance: " + format_currency(self.balance))
-        self.trade_history = []
-        self.candlesticks = []
-        self.prices = []
-        self.temp_price = []
-
-        # Using Thread
-        self.price_queue = Queue()
-        self.stop_event = threading.Event()
-        self.thread = threading.Thread(target=price_generator_thread,
-                                       args=(self.price_queue, self.stop_event, 5, True))
-        self.thread.start()
-        self.start_time = time.time()
-        self.temp_time = self.start_time
-
-        # Using QTimer
+        self.account = Account(float(self.text_balance.toPlainText().replace("$", '')))
+        self.lable_balance.setText("Balance: " + format_currency(self.account.balance))
+        # Closed trades and the equity curve, kept as numbers and formatted only by the status table
+        self.journal = Journal()
+        self.journal_path = journal_path
+        self.trade_history = self.journal
+        self.candle_builder = MultiCandleBuilder(CANDLE_TIMEFRAMES)
+        self.candlesticks = self.candle_builder[CANDLE_INTERVAL].candles
+
+        # Indicators of the charted candles, updated once per closed candle and drawn over the chart
+        self.indicators = IndicatorSet(default_indicators(), 'ask', chart_window)
+        for name, axis in self.indicators.series().items():
+            self.chart.add_overlay(name, axis)
+        self.overlay_points = {}
+
+        # Optional on-disk history of ticks and finished candles
+        self.tick_store = None
+        self.candle_store = None
+        if store_dir is not None:
+            self.tick_store = TickStore(os.path.join(store_dir, 'ticks.bin'))
+            self.candle_store = CandleStore(store_dir)
+
+        self.clock = make_clock() if clock is None else clock
+        self.begin_time = None
+        self.session_elapsed = 0
+        self.last_tick = None
+        # perf_counter time at which the last tick was received from the feed
+        self.last_stamp = None
+        # Margin events of the ticks since the last refresh, reported once per frame
+        self.margin_events = set()
+        self.in_margin_call = False
+        self.chart_candles = []
+
+        # Resuming a previous run where it left off
+        self.snapshot_path = snapshot_path
+        start = None
+        if snapshot is not None:
+            self.restore_snapshot(snapshot)
+            if self.account.last_bid_price is not None:
+                start = (self.account.last_bid_price, self.account.last_ask_price)
+
+        self.bus = None
+        self.thread = None
         self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_data)
-        self.timer.start(1000)  # Update every second
-        self.temp_time = time.time()
-        self.begin_time = time.time()
+        if loop is not None:
+            # Using asyncio: ticks are pushed to process_tick as they arrive, the UI is redrawn per frame
+            if replay_path is None:
+                source = generated_ticks(5, self.clock, self.tick_store, start)
+            else:
+                source = replayed_ticks(iter_ticks(replay_path), self.clock)
+            self.frame = FrameScheduler(self.refresh, FRAME_INTERVAL / 1000, loop)
+            self.bus = TickBus()
+            self.bus.subscribe(self.on_tick)
+            self.bus.start(source, loop)
+        else:
+            # Using Thread
+            self.price_queue = StampedQueue(MAX_QUEUE)
+            self.stop_event = threading.Event()
+            if replay_path is None:
+                self.thread = threading.Thread(target=price_generator_thread,
+                                               args=(self.price_queue, self.stop_event, 5, True, self.clock, self.tick_store,
+                                                     start))
+            else:
+                self.thread = threading.Thread(target=replay_thread,
+                                               args=(self.price_queue, self.stop_event, iter_ticks(replay_path), self.clock))
+            self.thread.start()
+
+            # Using QTimer
+            self.timer.timeout.connect(self.update_data)
+            self.timer.start(FRAME_INTERVAL)
 
     
     def deposit(self):
         """
         Handles the deposit of funds into the account balance.
         """
-        if self.trade_in_progress:
+        if self.account.trade_in_progress:
             self.update_message("Trading in progress ...")
             return
 
@@ -110,227 +199,288 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         if not is_float(input_balance) :
             self.update_message("Wrong Number !")
             return
-        if float(self.text_balance.toPlainText()) < 0:
-            self.update_message("Wrong Number !")
+        try:
+            self.account.deposit(float(input_balance))
+        except TradeError as e:
+            self.update_message(str(e))
             return
-        self.balance = float(self.text_balance.toPlainText())
-        self.lable_balance.setText("Balance: " + format_currency(self.balance))
-        self.update_message(f"Depositing {format_currency(self.balance)}")
+        self.lable_balance.setText("Balance: " + format_currency(self.account.balance))
+        self.update_message(f"Depositing {format_currency(self.account.balance)}")
         
  
     def initiate_trade(self):
         """
         Initiates a new trade based on user input.
         """
-        if self.trade_in_progress: 
+        if self.account.trade_in_progress:
             self.update_message("Trade in progress")
             return
-        if self.last_ask_price is None: 
+        if self.account.last_ask_price is None:
             self.update_message("Waiting for new Price ...")
-            return   
-        
-        self.base_curr = 'euro'
-        self.quote_curr = 'usd'
+            return
+
         units_to_trade_string = self.text_trade.toPlainText()
-        
         if not is_float(units_to_trade_string):
             self.update_message("Wrong Number !")
             return
-        self.units_to_trade = float(self.text_trade.toPlainText())
-        if self.units_to_trade <=0 :
-            self.update_message("Wrong Number !")
-            return
 
-        self.mode = 'long' if self.radio_buy.isChecked() else 'short'
-            
-        self.margin, _ = self.margin_cal(self.mode, self.base_curr, self.quote_curr, 
-                                    self.last_bid_price, self.last_ask_price, self.units_to_trade)
-        if self.balance < self.margin:
-            self.update_message("Not enough Funds !\n, Increase balance to at least " + format_currency(self.margin))
+        mode = 'long' if self.radio_buy.isChecked() else 'short'
+        try:
+            position = self.account.open_position(mode, float(units_to_trade_string), 'euro', 'usd')
+        except TradeError as e:
+            self.update_message(str(e))
             return
 
-        self.trade_in_progress = True
-        self.enter_position_bid_price = self.last_bid_price
-        self.enter_position_ask_price = self.last_ask_price
-        if self.mode == 'long':
+        if position.mode == 'long':
             trade_msg = 'Buying'
             trade_msg2 = 'ASK price of'
-            price = format_currency(self.enter_position_ask_price)
+            price = format_currency(position.enter_ask_price)
         else:
             trade_msg = 'Selling'
             trade_msg2 = 'BID price of'
-            price = format_currency(self.enter_position_bid_price)
+            price = format_currency(position.enter_bid_price)
 
-        msg = f"New Trade opens: \n {trade_msg} {format_currency(self.units_to_trade, '€')} with\n {trade_msg2} : {price} \n "
+        msg = f"New Trade opens: \n {trade_msg} {format_currency(position.units_to_trade, '€')} with\n {trade_msg2} : {price} \n "
         self.update_message(msg, True)
 
-    def trade(self, mode, base_curr, quote_curr, units_to_trade):
+    def trade(self, bid_price, ask_price, price_time):
         """
-        Executes and evaluates a trade based on the current market conditions.
+        Feeds a new tick into the trading engine and records margin calls and stop-outs,
+        which refresh reports once per frame.
+
         Args:
-        mode (str): The trade mode, either 'long' (buy) or 'short' (sell).
-        base_curr (str): The base currency in the trade pair.
-        quote_curr (str): The quote currency in the trade pair.
-        units_to_trade (float): The number of units involved in the trade.
-        """
-        profit = -1
-        if mode == 'long': 
-            bid_ask_price_diff = self.last_bid_price - self.enter_position_ask_price
-            if bid_ask_price_diff > 0:
-                profit = 1
-        else:
-            bid_ask_price_diff = self.last_ask_price - self.enter_position_bid_price
-            if bid_ask_price_diff < 0 :
-                profit = 1
-
-        # Calculate price difference in pips        
-        bid_ask_price_diff_pips = round(bid_ask_price_diff * 10000, 4)
-        pip = 0.0001
-        back_to_usd = 1   
-        self.float_pl = profit * abs(bid_ask_price_diff_pips) * pip * units_to_trade * back_to_usd
-        self.equity = self.balance + self.float_pl
-        self.used_margin, position_value = self.margin_cal(mode, base_curr, quote_curr, self.last_bid_price, self.last_ask_price, units_to_trade)
-        self.margin_level = abs(round(self.equity / self.used_margin * 100, 2))
-        self.free_margin = self.equity - self.used_margin
-        self.realize_PL = 0
-        status = [format_currency(self.balance), format_currency(self.equity),
-                     format_currency(self.float_pl), format_currency(self.used_margin),
-                      format_currency(self.free_margin), str(self.margin_level) + '%', format_currency(self.realize_PL)]
-        temp_list = self.trade_history.copy()
-        temp_list.append(status)
-        df = pd.DataFrame(temp_list, columns=['Balance', 'Equity', 'Float_PL', 'Used_Margin', 'Free_Margin', 'Margin_Level', 'Realized_PL'])
-        self.load_dataframe(df, self.table_status)
-        if self.margin_level < 100:
-            self.update_message("WARNING !! \nMargin Call !!\n Margin LEVEL below 100%")
-        if self.margin_level < 50:
-            self.update_message("STOP OUT LEVEL REACHED !!\n MARGIN LEVEL BELOW 50 %\n LIQUIDATION")
-            self.close_trade()
+        bid_price (float): The new bid price.
+        ask_price (float): The new ask price.
+        price_time (datetime): The time of the tick.
+        """
+        events = self.account.on_tick(bid_price, ask_price, price_time)
+        if events:
+            self.margin_events.update(events)
+        if 'stop_out' in events:
+            self.show_closed_trade(self.account.last_closed)
 
-    
     def close_trade(self):
         """
         Closes the currently active trade and updates the account balances.
         """
-        if not self.trade_in_progress:
-            self.update_message("No Trade in progress", True)
+        try:
+            position = self.account.close_position()
+        except TradeError as e:
+            self.update_message(str(e), True)
             return
+        self.show_closed_trade(position)
 
-        self.balance = self.equity
-        self.free_margin = self.equity
-        self.realize_PL = self.float_pl
-        self.used_margin = 0
-        self.float_pl = 0
-        self.margin_level = 0
-        status = [format_currency(self.balance), format_currency(self.equity),
-                     format_currency(self.float_pl), format_currency(self.used_margin),
-                      format_currency(self.free_margin), str(self.margin_level) + '%', self.realize_PL]
-
-        self.trade_history.append(status)
-        df = pd.DataFrame(self.trade_history, columns=['Balance', 'Equity', 'Float_PL', 'Used_Margin', 'Free_Margin', 'Margin_Level','Realized_Pl'])
-
-        self.load_dataframe(df, self.table_status)
-        self.trade_in_progress = False
-        self.text_balance.setText(str(self.balance))
-        if self.mode == 'long':
-            msg = 'with BID price of ' + format_currency(self.last_bid_price)
+    def show_closed_trade(self, position):
+        """
+        Records a closed trade in the trade history and refreshes the balance widgets.
+
+        Args:
+        position (Position): The position that has just been closed.
+        """
+        status = self.account.status()
+        self.journal.record_trade(position, self.account.balance)
+        self.status_model.set_live_row(None)
+        self.status_model.append_row(status)
+        self.text_balance.setText(str(self.account.balance))
+        if position.mode == 'long':
+            msg = 'with BID price of ' + format_currency(position.exit_bid_price)
         else:
-            msg = 'with ASK price of ' + format_currency(self.last_ask_price)
+            msg = 'with ASK price of ' + format_currency(position.exit_ask_price)
         self.update_message(f"Closing the Trade! \n {msg}")
-        self.lable_balance.setText("Balance: " + format_currency(self.balance))
-    
+        self.lable_balance.setText("Balance: " + format_currency(self.account.balance))
+
+    def show_margin_events(self):
+        """
+        Reports the margin events of the frame: a stop-out, or a margin call the first time the account
+        falls below the margin-call level.
+        """
+        events, self.margin_events = self.margin_events, set()
+        if 'stop_out' in events:
+            self.update_message("STOP OUT LEVEL REACHED !!\n MARGIN LEVEL BELOW 50 %\n LIQUIDATION")
+        elif 'margin_call' in events and not self.in_margin_call:
+            self.update_message("WARNING !! \nMargin Call !!\n Margin LEVEL below 100%")
+        self.in_margin_call = 'margin_call' in events and 'stop_out' not in events
+
     def update_data(self):
         """
-        Continuously fetches and updates the latest bid and ask prices from a price queue.
+        Drains every tick waiting in the price queue, feeds them all to the engine and the candle builder,
+        then refreshes the UI once with the latest state.
         """
+        ticks = drain_queue(self.price_queue, MAX_TICKS_PER_FRAME)
+        if METRICS.enabled:
+            METRICS.gauge('queue_depth', self.price_queue.qsize())
+            METRICS.count('ticks', len(ticks))
+        if not ticks:
+            return
+        # The queue records how long every tick waited in it
+        self.last_stamp = self.price_queue.last_stamp
+
         try:
-            
-            while True:
-                try:
-                    new_bid_price, new_ask_price, price_time = self.price_queue.get_nowait()
-                    self.last_ask_price = new_ask_price
-                    self.last_bid_price = new_bid_price
-                    print(f"New Bid Price: {new_bid_price}, New Ask Price: {new_ask_price}, Time: {price_time}")
-                    self.ask_price.setText("New ask price: " + str(new_ask_price))
-                    self.bid_price.setText("New bid price: " + str(new_bid_price))
-                    price_entry = {"ask": new_ask_price, "bid": new_bid_price, "time": price_time}
-                    self.temp_price.append(price_entry)
-                    if self.trade_in_progress:
-                        self.trade(self.mode, self.base_curr, self.quote_curr, self.units_to_trade)
-                    current_time = time.time()
-                    # Drawing plots
-                    if current_time - self.temp_time >= 30:
-                        self.prices.append(self.temp_price)
-                        max_ask_price, min_ask_price, open_ask_price, close_ask_price, candle_time = process_price(self.temp_price)
-                        
-                        self.candlesticks.append((candle_time, open_ask_price, close_ask_price, max_ask_price, min_ask_price))
-                        self.temp_price = []
-                        self.temp_time = current_time
-                        if self.radio_candle.isChecked():
-                            html, df = update_candlestick_chart(self.candlesticks, self.fig, 'candle')
-                        else:
-                            html, df = update_candlestick_chart(self.candlesticks, self.fig2, 'line')
-                        self.web_view.setHtml(html)
-
-                except Empty:
+            for new_bid_price, new_ask_price, price_time in ticks:
+                if not self.process_tick(new_bid_price, new_ask_price, price_time):
                     break
+        except Exception:
+            logger.exception("Exception in data update")
+        self.refresh()
 
-                if time.time() - self.begin_time > 500:
-                    self.update_message("Market Closed ! \n Closing active trades ... ")
-                    self.close_trade()
-                    self.stop_timer()
-                    self.stop_event.set()
-                    self.thread.join()
-        
-        except Exception as e:
-            print(f"Exception in data update: {e}")
-    
-    def margin_cal(self, mode, base_curr, quote_curr, bid_price, ask_price, units_to_trade):
+    def on_tick(self, bid_price, ask_price, price_time):
+        """
+        Subscriber of the asyncio price feed: processes the tick at once and asks for a redraw.
         """
-        Calculates the required margin and position value for a given trade.
+        self.last_stamp = time.perf_counter()
+        self.process_tick(bid_price, ask_price, price_time)
+        self.frame.request()
 
-        Args:
-            mode (str): The type of trade ('long' or 'short').
-            base_curr (str): The base currency of the trade.
-            quote_curr (str): The quote currency of the trade.
-            bid_price (float): The current bid price of the currency pair.
-            ask_price (float): The current ask price of the currency pair.
-            units_to_trade (float): The number of units to trade.
+    def process_tick(self, bid_price, ask_price, price_time):
+        """
+        Feeds one tick to the engine, the candle builder and the candle store, and closes the market
+        once the session is over.
 
         Returns:
-            tuple: The calculated margin and the total position value.
+            bool: False once the market has closed.
+        """
+        with METRICS.timer('engine_update'):
+            self.trade(bid_price, ask_price, price_time)
+        self.journal.record_equity(price_time, self.account.status())
+        self.last_tick = (bid_price, ask_price, price_time)
+        # Candles and market hours follow the clock time the tick was stamped with
+        current_time = price_time.timestamp()
+        if self.begin_time is None:
+            self.begin_time = current_time - self.session_elapsed
+        closed = self.candle_builder.update(bid_price, ask_price, price_time, current_time)
+        if closed:
+            with METRICS.timer('candle_close'):
+                for timeframe, candle in closed:
+                    if timeframe == CANDLE_INTERVAL:
+                        self.chart_candles.append(candle.as_tuple('ask'))
+                        self.add_indicator_values(candle)
+                    if self.candle_store is not None:
+                        self.candle_store.append(timeframe, candle)
+
+        if current_time - self.begin_time > MARKET_SESSION:
+            self.update_message("Market Closed ! \n Closing active trades ... ")
+            self.close_trade()
+            self.stop_feed()
+            if self.snapshot_path is not None:
+                # The next run starts a new session with the same account and history
+                self.save_snapshot(self.snapshot_path, 0)
+            return False
+        return True
+
+    def refresh(self):
+        """
+        Refreshes the prices, the live status row and the chart with the latest state.
+        """
+        if self.last_tick is None:
+            return
+        new_bid_price, new_ask_price, price_time = self.last_tick
+        logger.debug("New Bid Price: %s, New Ask Price: %s, Time: %s", new_bid_price, new_ask_price, price_time)
+        if self.last_stamp is not None:
+            # Wall time from the tick leaving the feed to it being displayed
+            METRICS.observe('tick_to_display', time.perf_counter() - self.last_stamp)
+        self.show_margin_events()
+        self.ask_price.setText("New ask price: " + str(new_ask_price))
+        self.bid_price.setText("New bid price: " + str(new_bid_price))
+        if self.account.trade_in_progress:
+            self.status_model.set_live_row(self.account.status())
+
+        # Drawing plots: the candles closed since the last update and the one still forming
+        chart_candles = self.chart_candles
+        self.chart_candles = []
+        current = self.candle_builder[CANDLE_INTERVAL].current
+        if current is not None:
+            chart_candles.append(current.as_tuple('ask'))
+        if chart_candles:
+            with METRICS.timer('chart_render'):
+                self.chart.update(chart_candles)
+                if self.overlay_points:
+                    self.chart.update_overlays(self.overlay_points)
+                    self.overlay_points = {}
+
+        if METRICS.enabled:
+            self.update_metrics()
+
+    def update_metrics(self):
+        """
+        Shows the latest metrics in the status panel and exports them periodically.
+        """
+        if self.metrics_label is not None:
+            self.metrics_label.setText(METRICS.summary())
+        now = time.time()
+        if self.metrics_path is not None and now - self.metrics_exported >= METRICS_EXPORT_INTERVAL:
+            METRICS.export(self.metrics_path)
+            self.metrics_exported = now
+
+    def export_journal(self, path):
+        """
+        Writes the closed trades to path and the equity curve next to it, then logs the journal statistics.
         """
-        marin_rate = 0.2
-        if mode=='long':
-            exchange_rate = ask_price
-        elif mode == 'short':
-            exchange_rate = bid_price
+        stem, extension = os.path.splitext(path)
+        self.journal.export(path, 'trades')
+        self.journal.export(stem + '_equity' + extension, 'equity')
+        logger.info("Journal: %s", self.journal.stats())
 
-        if base_curr.lower() != 'usd':
-            position_value = exchange_rate * units_to_trade
-        else:
-            position_value = units_to_trade
-        print('Position Value : ', format_currency(position_value))
-        margin = marin_rate * position_value
-        print("Used Margin : ", format_currency(margin) + " for " + str(marin_rate * 100) + " % of position size")
-        return margin, position_value
-    
-    def load_dataframe(self, df, table):
+    def save_snapshot(self, path, session_elapsed):
         """
-        Loads a pandas DataFrame into a QTableWidget for display.
+        Saves the account, candles, journal, status table and price generator state to a snapshot file.
 
         Args:
-            df (DataFrame): The DataFrame containing data to load into the table.
-            table (QTableWidget): The table widget where the data will be displayed.
-        """
-        table.clear()
-        table.setRowCount(len(df))
-        table.setColumnCount(len(df.columns))
-        table.setHorizontalHeaderLabels(df.columns)
-        for row in range(len(df)):
-            for col in range(len(df.columns)):
-                item = QTableWidgetItem(str(df.iat[row, col]))
-                table.setItem(row, col, item)
-    
+        path (str): The snapshot file.
+        session_elapsed (float): Seconds of the market session already run.
+        """
+        snapshot = Snapshot.capture(account=self.account, candles=self.candle_builder, journal=self.journal,
+                                    clock_time=self.clock.time(), session_elapsed=session_elapsed,
+                                    status_rows=self.status_model.rows)
+        snapshot.save(path)
+        logger.info("Saved snapshot to %s", path)
+
+    def restore_snapshot(self, snapshot):
+        """
+        Restores the state saved by save_snapshot. The price feed must not be running yet.
+        """
+        extra = snapshot.extra
+        self.account = snapshot.account()
+        self.candle_builder = snapshot.candles()
+        self.candlesticks = self.candle_builder[CANDLE_INTERVAL].candles
+        self.journal = snapshot.journal()
+        self.trade_history = self.journal
+        snapshot.restore_random()
+        self.session_elapsed = extra['session_elapsed']
+        for row in extra['status_rows']:
+            self.status_model.append_row(row)
+        self.lable_balance.setText("Balance: " + format_currency(self.account.balance))
+        self.text_balance.setText(str(self.account.balance))
+        chart_candles = [candle.as_tuple('ask') for candle in self.candlesticks]
+        current = self.candle_builder[CANDLE_INTERVAL].current
+        if current is not None:
+            chart_candles.append(current.as_tuple('ask'))
+        if chart_candles:
+            self.chart.update(chart_candles)
+        for candle in self.candlesticks:
+            self.add_indicator_values(candle)
+        self.chart.update_overlays(self.overlay_points)
+        self.overlay_points = {}
+        if self.account.trade_in_progress:
+            self.status_model.set_live_row(self.account.status())
+        self.update_message("Resuming the previous session ...")
+
+    def add_indicator_values(self, candle):
+        """
+        Updates the indicators with a closed candle and queues their new values for the chart.
+        """
+        for name, value in self.indicators.update(candle).items():
+            self.overlay_points.setdefault(name, []).append((candle.time, value))
+
+    def feed_running(self):
+        if self.bus is not None:
+            return not self.bus.task.done()
+        return self.thread.is_alive()
+
+    def change_chart_view(self):
+        """
+        Switches the chart between the candlestick and line views.
+        """
+        self.chart.set_view('candle' if self.radio_candle.isChecked() else 'line')
     
     def make_center(self):
         screen = QApplication.desktop().screenNumber(QApplication.desktop().cursor().pos())
@@ -356,30 +506,95 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         new_message = previous_text + '\n' + msg
         self.label_status.setText(new_message)
 
+    def stop_feed(self):
+        """
+        Stops the price feed, whether it runs on the asyncio loop or in a background thread.
+        """
+        self.stop_timer()
+        if self.bus is not None:
+            self.bus.stop()
+            self.frame.cancel()
+        elif self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+
     def stop_app(self):
         """
-        Stops the background thread and quits the application.
+        Stops the price feed and quits the application.
         """
-        self.stop_event.set()
-        self.thread.join()
+        self.stop_feed()
         QApplication.quit()
 
     def start_timer(self):
         """
-        Starts the timer with a 1-second interval.
+        Starts the timer with the frame interval.
         """
-        self.timer.start(1000)  # Restart the timer with the same interval
+        self.timer.start(FRAME_INTERVAL)  # Restart the timer with the same interval
 
     def stop_timer(self):
         self.timer.stop()  # Stop the timer
 
     def closeEvent(self, event):
-        self.stop_event.set()
-        self.thread.join()
+        # After the market close the snapshot has already been saved
+        session_running = self.feed_running()
+        self.stop_feed()
+        if self.tick_store is not None:
+            self.tick_store.close()
+        if self.candle_store is not None:
+            self.candle_store.close()
+        if self.metrics_path is not None:
+            METRICS.export(self.metrics_path)
+        if self.journal_path is not None:
+            self.export_journal(self.journal_path)
+        if self.snapshot_path is not None and session_running:
+            # Without a tick since the start (or the restore) no session time has passed
+            if self.begin_time is None:
+                elapsed = self.session_elapsed
+            else:
+                elapsed = self.account.last_time.timestamp() - self.begin_time
+            self.save_snapshot(self.snapshot_path, elapsed)
         event.accept()
         
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    parser = argparse.ArgumentParser(description="EUR/USD trading simulator")
+    parser.add_argument('--speed', type=float, default=1,
+                        help="replay speed: 1 for real time, N for N times faster, 0 for as fast as possible")
+    parser.add_argument('--chart-window', type=int, default=CHART_WINDOW,
+                        help="number of candles kept on the chart")
+    parser.add_argument('--store', help="directory where ticks and finished candles are recorded")
+    parser.add_argument('--replay', help="replay recorded ticks from a CSV or tick store file instead of generating them")
+    parser.add_argument('--metrics', help="enable instrumentation and export the metrics to this JSON file")
+    parser.add_argument('--journal',
+                        help="on exit, write the closed trades to this .csv or .parquet file and the equity curve next to it")
+    parser.add_argument('--snapshot',
+                        help="resume from this snapshot file if it exists, and save the session to it on exit")
+    parser.add_argument('--threaded', action='store_true',
+                        help="poll a feed thread with a timer instead of running the feed on an asyncio loop")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args, qt_args = parser.parse_known_args()
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.metrics:
+        METRICS.enable()
+    app = QApplication(sys.argv[:1] + qt_args)
+    snapshot = None
+    if args.snapshot and os.path.exists(args.snapshot):
+        snapshot = Snapshot.load(args.snapshot)
+    clock = make_clock(args.speed, None if snapshot is None else snapshot.extra['clock_time'])
+    try:
+        import qasync
+    except ImportError:
+        qasync = None
+    if qasync is None or args.threaded:
+        window = MainWindow(clock, args.chart_window, args.store, args.replay, args.metrics,
+                            journal_path=args.journal, snapshot_path=args.snapshot, snapshot=snapshot)
+        window.show()
+        sys.exit(app.exec_())
+
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    window = MainWindow(clock, args.chart_window, args.store, args.replay, args.metrics, loop,
+                        args.journal, args.snapshot, snapshot)
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    app.lastWindowClosed.connect(loop.stop)
+    with loop:
+        loop.run_forever()
\ No newline at end of file
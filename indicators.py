@@ -0,0 +1,464 @@
+"""
+Technical indicators over candle and tick streams.
+
+Every indicator comes in two forms that give the same numbers:
+
+- a class updated with one new value (or candle) at a time in O(1), keeping only a ring buffer of the
+  last `period` inputs and running sums, for live charts;
+- a function computing the whole series of a historical array at once with NumPy, for backtests,
+  returning NaN where the indicator is still warming up.
+
+Running sums are re-added from the ring buffer every time it wraps around, so floating-point drift
+never builds up over long streams while updates stay amortized O(1).
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+
+PRICE_AXIS = 'y'
+OSCILLATOR_AXIS = 'y2'
+
+
+class RingBuffer:
+    """
+    Fixed-size circular buffer of the last `size` values.
+    """
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.values = [0.0] * size
+        self.index = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    def append(self, value):
+        """
+        Stores a value, overwriting the oldest one once the buffer is full.
+
+        Returns:
+            float: The value dropped from the buffer, or None while it is filling up.
+        """
+        dropped = self.values[self.index] if self.count == self.size else None
+        self.values[self.index] = value
+        self.index += 1
+        if self.index == self.size:
+            self.index = 0
+        if self.count < self.size:
+            self.count += 1
+        return dropped
+
+    @property
+    def wrapped(self):
+        """
+        True right after the oldest value has been overwritten for a whole turn of the buffer.
+        """
+        return self.index == 0 and self.count == self.size
+
+
+def price_of(candle, side='ask'):
+    """
+    Returns the (high, low, close) prices of one side of a candle.
+    """
+    if side == 'ask':
+        return candle.ask_high, candle.ask_low, candle.ask_close
+    return candle.bid_high, candle.bid_low, candle.bid_close
+
+
+# Incremental indicators
+
+class SMA:
+    """
+    Simple moving average of the last `period` values.
+    """
+
+    axis = PRICE_AXIS
+
+    def __init__(self, period=20):
+        self.period = period
+        self.buffer = RingBuffer(period)
+        self.total = 0.0
+        self.value = None
+
+    def update(self, value):
+        dropped = self.buffer.append(value)
+        self.total += value if dropped is None else value - dropped
+        if self.buffer.wrapped:
+            self.total = math.fsum(self.buffer.values)
+        if self.buffer.full:
+            self.value = self.total / self.period
+        return self.value
+
+    def update_candle(self, candle, side='ask'):
+        return self.update(price_of(candle, side)[2])
+
+
+class EMA:
+    """
+    Exponential moving average, seeded with the simple average of the first `period` values.
+
+    The smoothing factor defaults to 2 / (period + 1); Wilder's smoothing (RSI, ATR) uses 1 / period.
+    """
+
+    axis = PRICE_AXIS
+
+    def __init__(self, period=20, alpha=None):
+        self.period = period
+        self.alpha = 2 / (period + 1) if alpha is None else alpha
+        self._seed = 0.0
+        self._count = 0
+        self.value = None
+
+    def update(self, value):
+        if self.value is not None:
+            self.value += self.alpha * (value - self.value)
+            return self.value
+        self._seed += value
+        self._count += 1
+        if self._count == self.period:
+            self.value = self._seed / self.period
+        return self.value
+
+    def update_candle(self, candle, side='ask'):
+        return self.update(price_of(candle, side)[2])
+
+
+class Bollinger:
+    """
+    Bollinger bands: the simple moving average and `width` population standard deviations around it.
+
+    update returns a (middle, upper, lower) tuple, or None while warming up.
+    """
+
+    axis = PRICE_AXIS
+    series = ('middle', 'upper', 'lower')
+
+    def __init__(self, period=20, width=2.0):
+        self.period = period
+        self.width = width
+        self.buffer = RingBuffer(period)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.shift = None
+        self.value = None
+
+    def update(self, value):
+        # Sums are kept relative to the first value to limit cancellation in the variance
+        if self.shift is None:
+            self.shift = value
+        value -= self.shift
+        dropped = self.buffer.append(value)
+        if dropped is None:
+            self.total += value
+            self.total_sq += value * value
+        else:
+            self.total += value - dropped
+            self.total_sq += value * value - dropped * dropped
+        if self.buffer.wrapped:
+            self.total = math.fsum(self.buffer.values)
+            self.total_sq = math.fsum(v * v for v in self.buffer.values)
+        if self.buffer.full:
+            mean = self.total / self.period
+            deviation = math.sqrt(max(self.total_sq / self.period - mean * mean, 0.0))
+            mean += self.shift
+            self.value = (mean, mean + self.width * deviation, mean - self.width * deviation)
+        return self.value
+
+    def update_candle(self, candle, side='ask'):
+        return self.update(price_of(candle, side)[2])
+
+
+class RSI:
+    """
+    Relative strength index with Wilder's smoothing, from 0 to 100.
+    """
+
+    axis = OSCILLATOR_AXIS
+
+    def __init__(self, period=14):
+        self.period = period
+        self.gains = EMA(period, 1 / period)
+        self.losses = EMA(period, 1 / period)
+        self._last = None
+        self.value = None
+
+    def update(self, value):
+        if self._last is not None:
+            change = value - self._last
+            gain = self.gains.update(change if change > 0 else 0.0)
+            loss = self.losses.update(-change if change < 0 else 0.0)
+            if gain is not None:
+                self.value = _rsi(gain, loss)
+        self._last = value
+        return self.value
+
+    def update_candle(self, candle, side='ask'):
+        return self.update(price_of(candle, side)[2])
+
+
+def _rsi(gain, loss):
+    if loss == 0:
+        return 50.0 if gain == 0 else 100.0
+    return 100 - 100 / (1 + gain / loss)
+
+
+class ATR:
+    """
+    Average true range with Wilder's smoothing.
+    """
+
+    axis = OSCILLATOR_AXIS
+
+    def __init__(self, period=14):
+        self.period = period
+        self.average = EMA(period, 1 / period)
+        self._close = None
+        self.value = None
+
+    def update(self, high, low, close):
+        if self._close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self._close), abs(low - self._close))
+        self._close = close
+        self.value = self.average.update(true_range)
+        return self.value
+
+    def update_candle(self, candle, side='ask'):
+        return self.update(*price_of(candle, side))
+
+
+class VWAP:
+    """
+    Volume-weighted average price on tick volume.
+
+    Over the whole stream (since the last reset) by default, or over the last `period` updates.
+    Candles are weighted by their tick count at their typical price (high + low + close) / 3; single ticks
+    can be fed with update(price).
+    """
+
+    axis = PRICE_AXIS
+
+    def __init__(self, period=None):
+        self.period = period
+        self.buffer = None
+        self.volumes = None
+        self.reset()
+
+    def reset(self):
+        """
+        Starts a new session.
+        """
+        self.weighted = 0.0
+        self.volume = 0.0
+        self.value = None
+        if self.period is not None:
+            self.buffer = RingBuffer(self.period)
+            self.volumes = RingBuffer(self.period)
+
+    def update(self, price, volume=1):
+        weighted = price * volume
+        self.weighted += weighted
+        self.volume += volume
+        if self.buffer is not None:
+            dropped = self.buffer.append(weighted)
+            dropped_volume = self.volumes.append(volume)
+            if dropped is not None:
+                self.weighted -= dropped
+                self.volume -= dropped_volume
+            if self.buffer.wrapped:
+                self.weighted = math.fsum(self.buffer.values)
+                self.volume = math.fsum(self.volumes.values)
+        if self.volume > 0:
+            self.value = self.weighted / self.volume
+        return self.value
+
+    def update_candle(self, candle, side='ask'):
+        high, low, close = price_of(candle, side)
+        return self.update((high + low + close) / 3, candle.volume)
+
+
+# Vectorized indicators
+
+def _nan(n):
+    return np.full(n, np.nan)
+
+
+def _smooth(values, alpha, initial):
+    # y[i] = (1 - alpha) * y[i - 1] + alpha * x[i] starting from y[-1] = initial, in closed form per block.
+    # Blocks are short enough for (1 - alpha) ** -block to stay far from overflow.
+    decay = 1 - alpha
+    if decay == 0:
+        return values.astype(np.float64)
+    block = max(1, int(200 / -math.log10(decay)))
+    out = np.empty(len(values))
+    previous = initial
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        steps = np.arange(len(chunk))
+        growth = decay ** -steps.astype(np.float64)
+        out[start:start + len(chunk)] = decay ** (steps + 1) * previous + alpha * np.cumsum(chunk * growth) / growth
+        previous = out[start + len(chunk) - 1]
+    return out
+
+
+def _rolling_sum(values, period):
+    total = np.cumsum(np.concatenate([[0.0], values]))
+    return total[period:] - total[:-period]
+
+
+def sma(values, period=20):
+    """
+    Simple moving average of an array.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = _nan(len(values))
+    if len(values) >= period:
+        out[period - 1:] = _rolling_sum(values, period) / period
+    return out
+
+
+def ema(values, period=20, alpha=None):
+    """
+    Exponential moving average of an array, seeded with the simple average of the first `period` values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    alpha = 2 / (period + 1) if alpha is None else alpha
+    out = _nan(len(values))
+    if len(values) >= period:
+        seed = values[:period].mean()
+        out[period - 1] = seed
+        out[period:] = _smooth(values[period:], alpha, seed)
+    return out
+
+
+def bollinger(values, period=20, width=2.0):
+    """
+    Bollinger bands of an array.
+
+    Returns:
+        tuple: The middle, upper and lower bands.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    middle = sma(values, period)
+    deviation = _nan(len(values))
+    if len(values) >= period:
+        # Sums of squares over a whole array lose too much precision, so every window is reduced directly
+        deviation[period - 1:] = np.lib.stride_tricks.sliding_window_view(values, period).std(axis=1)
+    return middle, middle + width * deviation, middle - width * deviation
+
+
+def rsi(values, period=14):
+    """
+    Relative strength index of an array with Wilder's smoothing.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = _nan(len(values))
+    change = np.diff(values)
+    if len(change) < period:
+        return out
+    gain = ema(np.maximum(change, 0.0), period, 1 / period)[period - 1:]
+    loss = ema(np.maximum(-change, 0.0), period, 1 / period)[period - 1:]
+    strength = np.divide(gain, loss, out=np.full(len(gain), np.inf), where=loss > 0)
+    index = 100 - 100 / (1 + strength)
+    index[(loss == 0) & (gain == 0)] = 50.0
+    out[period:] = index
+    return out
+
+
+def atr(high, low, close, period=14):
+    """
+    Average true range of high, low and close arrays with Wilder's smoothing.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    true_range = high - low
+    if len(close) > 1:
+        previous = close[:-1]
+        true_range[1:] = np.maximum.reduce([true_range[1:], np.abs(high[1:] - previous),
+                                            np.abs(low[1:] - previous)])
+    return ema(true_range, period, 1 / period)
+
+
+def vwap(prices, volumes=None, period=None):
+    """
+    Volume-weighted average price of an array, cumulative or over the last `period` values.
+
+    Args:
+        prices (array): Tick prices, or typical prices of candles.
+        volumes (array): Tick volumes, 1 per price when omitted.
+        period (int): The rolling window, the whole array when None.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    volumes = np.ones(len(prices)) if volumes is None else np.asarray(volumes, dtype=np.float64)
+    weighted = prices * volumes
+    if period is None:
+        weighted_sum = np.cumsum(weighted)
+        volume_sum = np.cumsum(volumes)
+    else:
+        weighted_sum = np.concatenate([np.cumsum(weighted[:period - 1]), _rolling_sum(weighted, period)])
+        volume_sum = np.concatenate([np.cumsum(volumes[:period - 1]), _rolling_sum(volumes, period)])
+    return np.divide(weighted_sum, volume_sum, out=_nan(len(prices)), where=volume_sum > 0)
+
+
+def typical_price(high, low, close):
+    return (np.asarray(high, dtype=np.float64) + np.asarray(low, dtype=np.float64)
+            + np.asarray(close, dtype=np.float64)) / 3
+
+
+# Chart integration
+
+class IndicatorSet:
+    """
+    Named indicators updated together with every closed candle.
+
+    Values are returned per chart series: one series per indicator, or '<name> <band>' for the bands of
+    Bollinger indicators. The last `maxlen` values of every series are kept with their candle times.
+    """
+
+    def __init__(self, indicators=None, side='ask', maxlen=1000):
+        self.indicators = dict(indicators or {})
+        self.side = side
+        self.maxlen = maxlen
+        self.history = {name: deque(maxlen=maxlen) for name in self.series()}
+
+    def series(self):
+        """
+        Returns the names of the chart series with the y axis ('y' for prices, 'y2' for oscillators).
+        """
+        series = {}
+        for name, indicator in self.indicators.items():
+            for band in getattr(indicator, 'series', (None,)):
+                series[name if band is None else f'{name} {band}'] = indicator.axis
+        return series
+
+    def update(self, candle):
+        """
+        Feeds a closed candle to every indicator.
+
+        Returns:
+            dict: The new value of every series, without those still warming up.
+        """
+        values = {}
+        for name, indicator in self.indicators.items():
+            value = indicator.update_candle(candle, self.side)
+            if value is None:
+                continue
+            if isinstance(value, tuple):
+                for band, band_value in zip(indicator.series, value):
+                    values[f'{name} {band}'] = band_value
+            else:
+                values[name] = value
+        for name, value in values.items():
+            self.history[name].append((candle.time, value))
+        return values
@@ -0,0 +1,216 @@
+"""
+Trade and equity journal.
+
+Closed trades and account snapshots are kept as typed NumPy records in arrays that double their capacity when
+full, so appending is amortized O(1) and the whole history can be analysed with vectorized statistics or
+exported in bulk. Nothing is formatted here; display code formats the numbers when it draws them.
+"""
+
+import math
+
+import numpy as np
+
+from tickstore import to_datetime64
+
+TRADE_DTYPE = np.dtype([('enter_time', '<M8[us]'), ('exit_time', '<M8[us]'), ('side', 'i1'), ('units', '<f8'),
+                        ('enter_price', '<f8'), ('exit_price', '<f8'), ('realized_pl', '<f8'),
+                        ('used_margin', '<f8'), ('margin_level', '<f8'), ('balance', '<f8')])
+EQUITY_DTYPE = np.dtype([('time', '<M8[us]'), ('balance', '<f8'), ('equity', '<f8'), ('float_pl', '<f8'),
+                         ('used_margin', '<f8'), ('free_margin', '<f8'), ('margin_level', '<f8'),
+                         ('realized_pl', '<f8')])
+
+
+def _time(price_time):
+    if price_time is None:
+        return np.datetime64('NaT', 'us')
+    return to_datetime64(price_time)
+
+
+class RecordBuffer:
+    """
+    Growable in-memory array of fixed-dtype records.
+    """
+
+    def __init__(self, dtype, capacity=1024):
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(capacity, dtype=self.dtype)
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    def append(self, record):
+        if self.n == len(self._data):
+            grown = np.zeros(max(2 * len(self._data), 1), dtype=self.dtype)
+            grown[:self.n] = self._data
+            self._data = grown
+        self._data[self.n] = record
+        self.n += 1
+
+    def extend(self, records):
+        """
+        Appends an array of records.
+        """
+        needed = self.n + len(records)
+        if needed > len(self._data):
+            capacity = max(len(self._data), 1)
+            while capacity < needed:
+                capacity *= 2
+            grown = np.zeros(capacity, dtype=self.dtype)
+            grown[:self.n] = self.records
+            self._data = grown
+        self._data[self.n:needed] = records
+        self.n = needed
+
+    @property
+    def records(self):
+        """
+        The records appended so far, as a view (no copy).
+        """
+        return self._data[:self.n]
+
+
+class Journal:
+    """
+    Journal of the closed trades and of the equity curve of one account.
+    """
+
+    def __init__(self, capacity=1024):
+        self.trades = RecordBuffer(TRADE_DTYPE, capacity)
+        self.equity = RecordBuffer(EQUITY_DTYPE, capacity)
+
+    def record_trade(self, position, balance):
+        """
+        Records a closed engine.Position.
+
+        Args:
+            position (Position): The closed position.
+            balance (float): The account balance once the position's P/L is realized.
+        """
+        self.trades.append((_time(position.enter_time), _time(position.exit_time),
+                            1 if position.mode == 'long' else -1, position.units_to_trade,
+                            position.enter_price, position.exit_price, position.realized_pl,
+                            position.used_margin, position.margin_level, balance))
+
+    def record_positions(self, portfolio, positions):
+        """
+        Records closed positions of a portfolio.Portfolio in bulk.
+
+        Portfolio positions release their margin when they close, so the margin columns are left as NaN.
+
+        Args:
+            portfolio (Portfolio): The portfolio holding the positions.
+            positions (array): The ids of the closed positions.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        records = np.zeros(len(positions), dtype=TRADE_DTYPE)
+        records['enter_time'] = np.round(portfolio.enter_time[positions] * 1e6).astype(np.int64).astype('datetime64[us]')
+        records['exit_time'] = np.round(portfolio.exit_time[positions] * 1e6).astype(np.int64).astype('datetime64[us]')
+        records['side'] = portfolio.side[positions]
+        records['units'] = portfolio.units[positions]
+        records['enter_price'] = portfolio.enter_price[positions]
+        records['exit_price'] = portfolio.exit_price[positions]
+        records['realized_pl'] = portfolio.position_pl[positions]
+        records['used_margin'] = np.nan
+        records['margin_level'] = np.nan
+        records['balance'] = portfolio.balance[portfolio.account[positions]]
+        self.trades.extend(records)
+
+    def record_equity(self, price_time, status):
+        """
+        Records a snapshot of the account figures.
+
+        Args:
+            price_time (datetime): The time of the snapshot.
+            status (list): The figures returned by Account.status, in the order of engine.STATUS_COLUMNS.
+        """
+        self.equity.append((_time(price_time), *status))
+
+    # Analytics
+
+    def stats(self, periods_per_year=None):
+        """
+        Summary statistics of the journal.
+
+        The Sharpe ratio is computed on the returns between consecutive equity snapshots; it is per
+        snapshot unless periods_per_year is given to annualize it. Exposure is the fraction of the time
+        covered by the equity curve during which a position was open.
+
+        Returns:
+            dict: trades, win_rate, total_pl, average_win, average_loss, profit_factor, sharpe,
+                  max_drawdown, max_drawdown_pct and exposure.
+        """
+        trades = self.trades.records
+        pl = trades['realized_pl']
+        wins = pl[pl > 0]
+        losses = pl[pl < 0]
+        gross_loss = -losses.sum()
+
+        stats = {
+            'trades': len(trades),
+            'win_rate': len(wins) / len(trades) if len(trades) else math.nan,
+            'total_pl': float(pl.sum()),
+            'average_win': float(wins.mean()) if len(wins) else math.nan,
+            'average_loss': float(losses.mean()) if len(losses) else math.nan,
+            'profit_factor': float(wins.sum() / gross_loss) if gross_loss > 0 else math.nan,
+        }
+        stats.update(self.equity_stats(periods_per_year))
+        return stats
+
+    def equity_stats(self, periods_per_year=None):
+        """
+        Sharpe ratio, maximum drawdown and exposure of the equity curve; see stats.
+        """
+        snapshots = self.equity.records
+        equity = snapshots['equity']
+        if len(equity) < 2:
+            return {'sharpe': math.nan, 'max_drawdown': 0.0, 'max_drawdown_pct': 0.0, 'exposure': math.nan}
+
+        previous = equity[:-1]
+        returns = np.divide(np.diff(equity), previous, out=np.zeros(len(previous)), where=previous != 0)
+        deviation = returns.std()
+        sharpe = returns.mean() / deviation if deviation > 0 else math.nan
+        if periods_per_year is not None:
+            sharpe *= math.sqrt(periods_per_year)
+
+        peak = np.maximum.accumulate(equity)
+        drawdown = peak - equity
+        drawdown_pct = np.divide(drawdown, peak, out=np.zeros(len(peak)), where=peak > 0)
+
+        # A snapshot's state lasts until the next snapshot
+        durations = np.diff(snapshots['time']).astype(np.float64)
+        total = durations.sum()
+        exposed = durations[snapshots['used_margin'][:-1] > 0].sum()
+        return {
+            'sharpe': float(sharpe),
+            'max_drawdown': float(drawdown.max()),
+            'max_drawdown_pct': float(drawdown_pct.max() * 100),
+            'exposure': float(exposed / total) if total > 0 else math.nan,
+        }
+
+    # Export
+
+    def to_frame(self, kind='trades'):
+        """
+        Returns the trades or the equity curve as a pandas DataFrame.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self._records(kind))
+
+    def export(self, path, kind='trades'):
+        """
+        Writes the trades or the equity curve to a Parquet (.parquet) or CSV file.
+        """
+        frame = self.to_frame(kind)
+        if path.endswith('.parquet'):
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+
+    def _records(self, kind):
+        if kind == 'trades':
+            return self.trades.records
+        if kind == 'equity':
+            return self.equity.records
+        raise ValueError(f"Unknown journal {kind!r}, expected 'trades' or 'equity'")
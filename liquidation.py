@@ -0,0 +1,139 @@
+"""
+Batched margin-call and stop-out sweep over every account of a Portfolio.
+
+One call per tick marks all positions to market, flags the accounts whose margin level crossed the
+margin-call or stop-out threshold and liquidates positions of stopped-out accounts, all with array
+operations. Events are appended to a compact structured array.
+"""
+
+import numpy as np
+
+from engine import MARGIN_CALL_LEVEL, STOP_OUT_LEVEL
+from portfolio import to_timestamp, group_cumsum
+
+MARGIN_CALL = 1
+STOP_OUT = 2
+
+EVENT_DTYPE = np.dtype([('time', 'f8'), ('account', 'i8'), ('position', 'i8'),
+                        ('kind', 'i1'), ('margin_level', 'f8'), ('pl', 'f8')])
+
+NO_POSITIONS = np.zeros(0, dtype=np.int64)
+NO_POSITIONS.flags.writeable = False
+
+
+class Liquidator:
+    """
+    Tests every account of a portfolio against the margin-call and stop-out levels on each tick.
+
+    Stopped-out accounts have their positions closed largest loss first (ties by position id) until the
+    margin level is back above the stop-out level or no position is left. A margin-call event is logged
+    when an account enters the margin-call zone, a stop-out event for every liquidated position.
+
+    A sweep costs a fixed overhead plus a few passes over the open positions and accounts, so the tick rate
+    drops as the book grows; the liquidation_sweep* benchmarks track it at 100, 1,000 and 10,000 accounts.
+    Books too large for one process should be split into independent shards swept by separate processes,
+    as montecarlo.py does.
+    """
+
+    def __init__(self, portfolio, margin_call_level=MARGIN_CALL_LEVEL, stop_out_level=STOP_OUT_LEVEL,
+                 capacity=1024):
+        self.portfolio = portfolio
+        self.margin_call_level = margin_call_level
+        self.stop_out_level = stop_out_level
+        self.in_margin_call = np.zeros(0, dtype=bool)
+        self._events = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.n_events = 0
+
+    @property
+    def events(self):
+        """
+        The event log as a structured array with EVENT_DTYPE.
+        """
+        return self._events[:self.n_events]
+
+    def _log(self, price_time, accounts, positions, kind, levels, pl):
+        count = len(accounts)
+        needed = self.n_events + count
+        if needed > len(self._events):
+            capacity = len(self._events)
+            while capacity < needed:
+                capacity *= 2
+            grown = np.zeros(capacity, dtype=EVENT_DTYPE)
+            grown[:self.n_events] = self.events
+            self._events = grown
+        rows = self._events[self.n_events:needed]
+        rows['time'] = price_time
+        rows['account'] = accounts
+        rows['position'] = positions
+        rows['kind'] = kind
+        rows['margin_level'] = levels
+        rows['pl'] = pl
+        self.n_events = needed
+
+    def margin_levels(self):
+        """
+        Returns the signed margin level of every account as of the last mark_to_market, infinite for accounts
+        without used margin.
+
+        Unlike Portfolio.margin_level the sign is kept, so a negative equity never looks like a healthy account.
+        """
+        return self.portfolio.signed_margin_level
+
+    def sweep(self, bid, ask, price_time=None):
+        """
+        Marks the portfolio to market and applies margin calls and stop-outs.
+
+        Args:
+            bid (float or array): Current bid price(s) per symbol.
+            ask (float or array): Current ask price(s) per symbol.
+            price_time (datetime): The time of the tick.
+
+        Returns:
+            numpy.ndarray: The ids of the positions liquidated by this tick.
+        """
+        portfolio = self.portfolio
+        portfolio.mark_to_market(bid, ask)
+        timestamp = to_timestamp(price_time)
+        if len(self.in_margin_call) < portfolio.n_accounts:
+            self.in_margin_call = np.r_[self.in_margin_call,
+                                        np.zeros(portfolio.n_accounts - len(self.in_margin_call), dtype=bool)]
+
+        level = self.margin_levels()
+
+        # Healthy ticks, the common case, cost a single comparison over the accounts
+        below = level < max(self.margin_call_level, self.stop_out_level)
+        if not below.any():
+            self.in_margin_call = below
+            return NO_POSITIONS
+
+        margin_call = level < self.margin_call_level
+        entered = margin_call & ~self.in_margin_call
+        if entered.any():
+            entered = np.flatnonzero(entered)
+            self._log(timestamp, entered, -1, MARGIN_CALL, level[entered], 0)
+        self.in_margin_call = margin_call
+
+        stopped = level < self.stop_out_level
+        if not stopped.any():
+            return NO_POSITIONS
+
+        open_positions = portfolio.open_positions
+        candidates = open_positions[stopped[portfolio.account[open_positions]]]
+        accounts = portfolio.account[candidates]
+        order = np.lexsort((candidates, portfolio.position_pl[candidates], accounts))
+        candidates = candidates[order]
+        accounts = accounts[order]
+
+        # Margin still in use before closing each candidate, in closing order
+        margin = portfolio.position_margin[candidates]
+        remaining = portfolio.used_margin[accounts] - group_cumsum(margin, accounts) + margin
+        with np.errstate(divide='ignore', invalid='ignore'):
+            level_before = np.where(remaining > 0, portfolio.equity[accounts] / remaining * 100, np.inf)
+        close = level_before < self.stop_out_level
+        liquidated = candidates[close]
+
+        pl = portfolio.position_pl[liquidated]
+        self._log(timestamp, accounts[close], liquidated, STOP_OUT, level_before[close], pl)
+        portfolio.close_many(liquidated, bid, ask, price_time)
+        self.in_margin_call = self.margin_levels() < self.margin_call_level
+        return liquidated
@@ -0,0 +1,178 @@
+"""
+Lightweight hot-path instrumentation.
+
+Latency histograms, counters and gauges are recorded on the module-level METRICS object. Instrumentation is
+off unless enabled (FOREX_METRICS=1 or Metrics.enable); when off, timer() returns a shared no-op context
+manager and count()/gauge()/observe() return straight away, so instrumented code pays almost nothing.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """
+    Latency histogram with power-of-two microsecond buckets.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = seconds * 1e6
+        bucket = max(int(micros), 1).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """
+        Returns the upper bound in seconds of the bucket holding the q-th percentile.
+        """
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets_us': {str(1 << bucket): n for bucket, n in sorted(self.buckets.items())},
+        }
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+
+class Metrics:
+    """
+    Registry of latency histograms, counters and gauges.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.gauges = {}
+
+    def timer(self, name):
+        """
+        Returns a context manager recording the duration of its block in the `name` histogram.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def observe(self, name, seconds):
+        """
+        Records one latency, in seconds.
+        """
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        histogram.record(seconds)
+
+    def count(self, name, n=1):
+        """
+        Adds n to a counter.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        """
+        Sets a gauge to its latest value.
+        """
+        if not self.enabled:
+            return
+        self.gauges[name] = value
+
+    def snapshot(self):
+        """
+        Returns every metric as a JSON-serializable dict.
+        """
+        with self._lock:
+            return {
+                'time': time.time(),
+                'latency': {name: h.to_dict() for name, h in self.histograms.items()},
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+            }
+
+    def export(self, path):
+        """
+        Writes a snapshot to a JSON file, replacing it atomically.
+        """
+        temp = path + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp, path)
+
+    def summary(self):
+        """
+        Returns a short human-readable summary for a status panel.
+        """
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):
+            lines.append(f"{name}: p50 {histogram.percentile(50) * 1e3:.2f} ms, "
+                         f"p99 {histogram.percentile(99) * 1e3:.2f} ms")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name}: {value}")
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f"{name}: {value}")
+        return '\n'.join(lines)
+
+
+METRICS = Metrics(enabled=os.environ.get('FOREX_METRICS') == '1')
@@ -0,0 +1,75 @@
+"""
+Qt item models used by the simulator's tables.
+"""
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+
+class StatusTableModel(QAbstractTableModel):
+    """
+    Append-only table of account status rows followed by an optional live row.
+
+    History rows are only ever appended, and the live row (the state of the open trade) is updated in place,
+    so refreshing the table costs one row whatever the length of the history. Rows hold raw values; the
+    per-column formatters turn them into text only when a cell is drawn.
+    """
+
+    def __init__(self, columns, parent=None, formatters=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.formatters = [str] * len(self.columns) if formatters is None else list(formatters)
+        self.rows = []
+        self.live_row = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows) + (self.live_row is not None)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        row = index.row()
+        values = self.rows[row] if row < len(self.rows) else self.live_row
+        column = index.column()
+        return self.formatters[column](values[column])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section]
+        return str(section + 1)
+
+    def append_row(self, values):
+        """
+        Appends a history row, placing it before the live row.
+        """
+        row = len(self.rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.append(values)
+        self.endInsertRows()
+
+    def set_live_row(self, values):
+        """
+        Shows or updates the live row; None removes it.
+        """
+        row = len(self.rows)
+        if values is None:
+            if self.live_row is not None:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                self.live_row = None
+                self.endRemoveRows()
+            return
+        if self.live_row is None:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.live_row = values
+            self.endInsertRows()
+            return
+        self.live_row = values
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1))
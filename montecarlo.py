@@ -0,0 +1,157 @@
+"""
+Parallel Monte Carlo runner for risk analysis.
+
+Every path is a separate account that opens one position on the first tick of its own seeded random walk
+and holds it until the end of the path or until it is stopped out. Paths are split into fixed-size shards
+run on a ProcessPoolExecutor; each shard gets its own child of a single SeedSequence, so results do not
+depend on the number of workers. Workers write their results straight into a shared-memory record array.
+
+Usage:
+    python montecarlo.py --paths 10000 --ticks 5000 --workers 8 --seed 1
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine import MARGIN_RATE
+from liquidation import Liquidator, STOP_OUT
+from portfolio import Portfolio
+from price import price_paths
+
+RESULT_DTYPE = np.dtype([('final_balance', 'f8'), ('max_drawdown', 'f8'), ('stopped_out', '?')])
+
+
+def simulate_paths(bid, ask, times, balance=10000, mode='long', units=10000, margin_rate=MARGIN_RATE):
+    """
+    Runs one account per price path through the portfolio and liquidation engines.
+
+    Args:
+        bid (numpy.ndarray): Bid prices with shape (n_paths, n_ticks).
+        ask (numpy.ndarray): Ask prices with shape (n_paths, n_ticks).
+        times (numpy.ndarray): The n_ticks timestamps.
+        balance (float): The starting balance of every account.
+        mode (str): 'long' or 'short'.
+        units (float): The number of units traded on every path.
+        margin_rate (float): The margin rate of every account.
+
+    Returns:
+        numpy.ndarray: One RESULT_DTYPE record per path.
+    """
+    n_paths, n_ticks = bid.shape
+    paths = np.arange(n_paths)
+    portfolio = Portfolio(n_paths)
+    portfolio.add_accounts(np.full(n_paths, balance, dtype=np.float64), margin_rate)
+    portfolio.open_many(paths, mode, units, bid[:, 0], ask[:, 0], times[0], symbols=paths)
+    liquidator = Liquidator(portfolio)
+
+    peak = portfolio.equity.copy()
+    max_drawdown = np.zeros(n_paths)
+    for tick in range(1, n_ticks):
+        liquidator.sweep(bid[:, tick], ask[:, tick], times[tick])
+        equity = portfolio.equity
+        np.maximum(peak, equity, out=peak)
+        np.maximum(max_drawdown, (peak - equity) / peak, out=max_drawdown)
+
+    still_open = portfolio.open_positions
+    if len(still_open):
+        portfolio.close_many(still_open, bid[:, -1], ask[:, -1], times[-1])
+
+    results = np.zeros(n_paths, dtype=RESULT_DTYPE)
+    results['final_balance'] = portfolio.balance
+    results['max_drawdown'] = max_drawdown
+    stopped = liquidator.events['account'][liquidator.events['kind'] == STOP_OUT]
+    results['stopped_out'][stopped] = True
+    return results
+
+
+def run_shard(shm_name, n_paths, start, stop, seed, n_ticks, params):
+    """
+    Simulates paths [start, stop) and writes their results into the shared result array.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        results = np.ndarray((n_paths,), dtype=RESULT_DTYPE, buffer=shm.buf)
+        bid, ask, times = price_paths(n_ticks, stop - start, seed=np.random.default_rng(seed))
+        results[start:stop] = simulate_paths(bid, ask, times, **params)
+        del results
+    finally:
+        shm.close()
+    return stop - start
+
+
+def run_monte_carlo(n_paths, n_ticks, seed=None, workers=None, shard_size=1000, **params):
+    """
+    Runs n_paths seeded price paths across a process pool.
+
+    Args:
+        n_paths (int): The number of paths to simulate.
+        n_ticks (int): The number of ticks of every path.
+        seed (int): Root seed; the same seed always gives the same results.
+        workers (int): The number of worker processes, defaults to the number of cores.
+        shard_size (int): The number of paths simulated together by one task.
+        **params: Passed to simulate_paths (balance, mode, units, margin_rate).
+
+    Returns:
+        numpy.ndarray: One RESULT_DTYPE record per path.
+    """
+    bounds = list(range(0, n_paths, shard_size)) + [n_paths]
+    seeds = np.random.SeedSequence(seed).spawn(len(bounds) - 1)
+    shm = shared_memory.SharedMemory(create=True, size=max(n_paths * RESULT_DTYPE.itemsize, 1))
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_shard, shm.name, n_paths, start, stop, shard_seed, n_ticks, params)
+                       for start, stop, shard_seed in zip(bounds[:-1], bounds[1:], seeds)]
+            for future in futures:
+                future.result()
+        results = np.ndarray((n_paths,), dtype=RESULT_DTYPE, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return results
+
+
+def summarize(results, balance=10000):
+    """
+    Summarizes the distribution of Monte Carlo results.
+
+    Returns:
+        dict: Percentiles of the final balance, drawdown statistics and the stop-out frequency.
+    """
+    final_balance = results['final_balance']
+    percentiles = np.percentile(final_balance, [5, 25, 50, 75, 95])
+    return {
+        'paths': len(results),
+        'mean_final_balance': float(final_balance.mean()),
+        'final_balance_percentiles': dict(zip(['p5', 'p25', 'p50', 'p75', 'p95'], percentiles.tolist())),
+        'probability_of_loss': float((final_balance < balance).mean()),
+        'mean_max_drawdown': float(results['max_drawdown'].mean()),
+        'worst_max_drawdown': float(results['max_drawdown'].max()),
+        'stop_out_frequency': float(results['stopped_out'].mean()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo risk analysis of a single EUR/USD position")
+    parser.add_argument('--paths', type=int, default=10000)
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--shard-size', type=int, default=1000)
+    parser.add_argument('--balance', type=float, default=10000)
+    parser.add_argument('--mode', choices=['long', 'short'], default='long')
+    parser.add_argument('--units', type=float, default=10000)
+    parser.add_argument('--margin-rate', type=float, default=MARGIN_RATE)
+    parser.add_argument('--output', help="save the per-path results to this .npy file")
+    args = parser.parse_args()
+
+    results = run_monte_carlo(args.paths, args.ticks, args.seed, args.workers, args.shard_size,
+                              balance=args.balance, mode=args.mode, units=args.units,
+                              margin_rate=args.margin_rate)
+    if args.output:
+        np.save(args.output, results)
+    for key, value in summarize(results, args.balance).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,135 @@
+"""
+Multi-symbol price feed.
+
+A MultiSymbolFeed advances dozens of currency pairs in one vectorized step with correlated moves, and
+SymbolCandles keeps a separate candle series for every pair, so a single thread can drive a whole
+multi-pair book.
+"""
+
+import numpy as np
+
+from candles import MultiCandleBuilder
+from clock import RealTimeClock
+from currency import CrossRates
+from price import correlated_price_paths
+
+DEFAULT_PAIRS = {
+    'EUR/USD': (1.0850, 1.0852, 4),
+    'GBP/USD': (1.2650, 1.2653, 4),
+    'USD/JPY': (149.50, 149.53, 2),
+    'USD/CHF': (0.8850, 0.8853, 4),
+    'AUD/USD': (0.6550, 0.6552, 4),
+    'USD/CAD': (1.3550, 1.3553, 4),
+    'EUR/GBP': (0.8580, 0.8582, 4),
+    'EUR/JPY': (162.20, 162.24, 2),
+}
+
+
+class MultiSymbolFeed:
+    """
+    Correlated random-walk prices for several currency pairs.
+
+    Ticks are generated `chunk` at a time with price.correlated_price_paths and handed out one row per step.
+    """
+
+    def __init__(self, symbols=None, start_bid=None, start_ask=None, corr=None, volatility=0.1,
+                 decimals=None, seed=None, chunk=1024):
+        if symbols is None:
+            symbols = list(DEFAULT_PAIRS)
+        self.symbols = list(symbols)
+        if start_bid is None:
+            start_bid = [DEFAULT_PAIRS[symbol][0] for symbol in self.symbols]
+        if start_ask is None:
+            start_ask = [DEFAULT_PAIRS[symbol][1] for symbol in self.symbols]
+        if decimals is None:
+            decimals = [DEFAULT_PAIRS.get(symbol, (0, 0, 4))[2] for symbol in self.symbols]
+        self.bid = np.asarray(start_bid, dtype=np.float64)
+        self.ask = np.asarray(start_ask, dtype=np.float64)
+        self.corr = corr
+        self.volatility = volatility
+        self.decimals = decimals
+        self.rng = np.random.default_rng(seed)
+        self.chunk = chunk
+        self.cross_rates = CrossRates(self.symbols)
+        self._bids = np.zeros((0, len(self.symbols)))
+        self._asks = np.zeros((0, len(self.symbols)))
+        self._next = 0
+
+    def index(self, symbol):
+        return self.symbols.index(symbol)
+
+    def generate(self, n_ticks):
+        """
+        Advances every pair by n_ticks ticks.
+
+        Returns:
+            tuple: Arrays of bid and ask prices with shape (n_ticks, n_pairs).
+        """
+        bids, asks = correlated_price_paths(n_ticks, self.bid, self.ask, self.corr, self.volatility,
+                                            self.rng, self.decimals)
+        if n_ticks:
+            self.bid = bids[-1]
+            self.ask = asks[-1]
+        return bids, asks
+
+    def step(self):
+        """
+        Advances every pair by one tick.
+
+        Returns:
+            tuple: The bid and ask price of every pair.
+        """
+        if self._next == len(self._bids):
+            # self.bid/self.ask already hold the last row of the previous chunk
+            self._bids, self._asks = self.generate(self.chunk)
+            self._next = 0
+        row = self._next
+        self._next += 1
+        return self._bids[row], self._asks[row]
+
+
+class SymbolCandles:
+    """
+    One set of multi-timeframe candle series per pair.
+    """
+
+    def __init__(self, symbols, timeframes=(5, 30, 60, 300), maxlen=1000):
+        self.symbols = list(symbols)
+        self.builders = [MultiCandleBuilder(timeframes, maxlen) for _ in self.symbols]
+
+    def __getitem__(self, symbol):
+        return self.builders[self.symbols.index(symbol)]
+
+    def update(self, bids, asks, price_time, timestamp=None):
+        """
+        Adds one tick of every pair.
+
+        Returns:
+            list: (symbol, timeframe, candle) tuples for the candles closed by this tick.
+        """
+        if timestamp is None:
+            timestamp = price_time.timestamp()
+        closed = []
+        for symbol, builder, bid_price, ask_price in zip(self.symbols, self.builders, bids.tolist(), asks.tolist()):
+            for timeframe, candle in builder.update(bid_price, ask_price, price_time, timestamp):
+                closed.append((symbol, timeframe, candle))
+        return closed
+
+
+def multi_price_generator_thread(queue, stop_event, feed, interval=5, clock=None):
+    """
+    Continuously puts (bids, asks, time) ticks of every pair of a MultiSymbolFeed into a queue.
+
+    Args:
+        queue (Queue): A queue object to store the generated prices.
+        stop_event (Event): An event used to stop the thread when needed.
+        feed (MultiSymbolFeed): The feed to advance.
+        interval (int): Time interval (in clock seconds) between two ticks.
+        clock (RealTimeClock): The clock pacing the updates, defaults to the wall clock.
+    """
+    if clock is None:
+        clock = RealTimeClock()
+    while not stop_event.is_set():
+        bids, asks = feed.step()
+        queue.put((bids, asks, clock.now()))
+        clock.wait(stop_event, interval)
@@ -0,0 +1,276 @@
+"""
+Pending orders: limit and stop entries, and stop-loss / take-profit exits attached to positions.
+
+Resting orders are kept in four price-sorted heaps per symbol, one for each trigger condition, so every tick
+only pops the orders that have been crossed: O(log n) per triggered order instead of a scan of the book.
+
+    buy limit     triggers when ask <= price    (highest price first)
+    buy stop      triggers when ask >= price    (lowest price first)
+    sell limit    triggers when bid >= price    (lowest price first)
+    sell stop     triggers when bid <= price    (highest price first)
+
+A stop-loss of a long position is a sell stop and its take-profit a sell limit; the other way round for a
+short position. Stop-loss and take-profit of the same position cancel each other (one-cancels-other).
+Cancelled orders are dropped lazily when they reach the top of their heap; a heap is rebuilt from its live
+orders once its cancelled entries outnumber them, so heaps stay proportional to the resting orders.
+"""
+
+import heapq
+import itertools
+
+import numpy as np
+
+from engine import TradeError
+from portfolio import LONG, SHORT, side_of
+
+LIMIT = 'limit'
+STOP = 'stop'
+STOP_LOSS = 'stop_loss'
+TAKE_PROFIT = 'take_profit'
+
+BUY_LIMIT = 0
+BUY_STOP = 1
+SELL_LIMIT = 2
+SELL_STOP = 3
+
+
+class Order:
+    """
+    A resting order. Entry orders open a position of `side`; exit orders close `position`.
+    """
+
+    __slots__ = ('id', 'account', 'side', 'kind', 'price', 'units', 'symbol', 'position', 'oco', 'queued')
+
+    def __init__(self, id, account, side, kind, price, units, symbol=0, position=None):
+        self.id = id
+        self.account = account
+        self.side = side
+        self.kind = kind
+        self.price = price
+        self.units = units
+        self.symbol = symbol
+        self.position = position
+        self.oco = None
+        # True while the order has an entry in its heap
+        self.queued = False
+
+    @property
+    def is_exit(self):
+        return self.position is not None
+
+    def __repr__(self):
+        side = 'buy' if self.side == LONG else 'sell'
+        return f"Order({self.id}, {side} {self.kind} {self.units} @ {self.price}, account={self.account})"
+
+
+def book_of(side, kind):
+    """
+    Returns the heap an order goes to from the side of the fill and the kind of trigger.
+    """
+    limit = kind in (LIMIT, TAKE_PROFIT)
+    if side == LONG:
+        return BUY_LIMIT if limit else BUY_STOP
+    return SELL_LIMIT if limit else SELL_STOP
+
+
+class OrderBook:
+    """
+    Resting orders of any number of accounts and symbols.
+    """
+
+    def __init__(self):
+        self.orders = {}
+        self.by_position = {}
+        self._heaps = {}
+        self._stale = {}
+        self._ids = itertools.count()
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self.orders)
+
+    def _heaps_of(self, symbol):
+        heaps = self._heaps.get(symbol)
+        if heaps is None:
+            heaps = self._heaps[symbol] = ([], [], [], [])
+            self._stale[symbol] = [0, 0, 0, 0]
+        return heaps
+
+    def _add(self, order):
+        book = book_of(order.side, order.kind)
+        # Max-heaps store the negated price; ties keep submission order
+        key = -order.price if book in (BUY_LIMIT, SELL_STOP) else order.price
+        heapq.heappush(self._heaps_of(order.symbol)[book], (key, next(self._seq), order.id))
+        order.queued = True
+        self.orders[order.id] = order
+        return order
+
+    def place(self, account, mode, kind, price, units, symbol=0):
+        """
+        Places a limit or stop entry order.
+
+        Args:
+            account (int): The account that places the order.
+            mode (str): 'long' (buy) or 'short' (sell).
+            kind (str): LIMIT or STOP.
+            price (float): The trigger price, compared with the ask for buy orders and the bid for sell orders.
+            units (float): The number of units to trade.
+            symbol (int): The symbol of the order.
+
+        Returns:
+            Order: The new order.
+        """
+        if kind not in (LIMIT, STOP):
+            raise TradeError(f"Unknown order kind {kind!r}")
+        if units <= 0 or price <= 0:
+            raise TradeError("Wrong Number !")
+        return self._add(Order(next(self._ids), account, side_of(mode), kind, price, units, symbol))
+
+    def attach(self, position, account, mode, units, stop_loss=None, take_profit=None, symbol=0):
+        """
+        Attaches stop-loss and/or take-profit exit orders to an open position.
+
+        Args:
+            position (int): The id of the position.
+            account (int): The account holding the position.
+            mode (str): The mode of the position, 'long' or 'short'.
+            units (float): The units of the position.
+            stop_loss (float): Close the position when the price reaches this level against it.
+            take_profit (float): Close the position when the price reaches this level in its favour.
+            symbol (int): The symbol of the position.
+
+        Returns:
+            list: The new orders.
+        """
+        exit_side = SHORT if side_of(mode) == LONG else LONG
+        orders = []
+        if stop_loss is not None:
+            orders.append(Order(next(self._ids), account, exit_side, STOP_LOSS, stop_loss, units, symbol, position))
+        if take_profit is not None:
+            orders.append(Order(next(self._ids), account, exit_side, TAKE_PROFIT, take_profit, units, symbol, position))
+        if len(orders) == 2:
+            orders[0].oco = orders[1].id
+            orders[1].oco = orders[0].id
+        for order in orders:
+            self._add(order)
+            self.by_position.setdefault(position, []).append(order.id)
+        return orders
+
+    def cancel(self, order_id):
+        """
+        Cancels a resting order; returns False if it is no longer in the book.
+        """
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return False
+        if order.queued:
+            order.queued = False
+            self._discard(order.symbol, book_of(order.side, order.kind))
+        if order.position is not None:
+            ids = self.by_position.get(order.position)
+            if ids is not None:
+                ids.remove(order_id)
+                if not ids:
+                    del self.by_position[order.position]
+        return True
+
+    def cancel_position(self, position):
+        """
+        Cancels the exit orders of a position closed by other means.
+        """
+        for order_id in list(self.by_position.get(position, ())):
+            self.cancel(order_id)
+
+    def _discard(self, symbol, book):
+        # The cancelled order's entry stays in its heap until popped or compacted away
+        self._stale[symbol][book] += 1
+        self._compact(symbol, book)
+
+    def _compact(self, symbol, book):
+        # Rebuilds a heap from its live orders once cancelled entries outnumber them
+        stale = self._stale[symbol]
+        heap = self._heaps[symbol][book]
+        if 2 * stale[book] > len(heap):
+            heap[:] = [entry for entry in heap if entry[2] in self.orders]
+            heapq.heapify(heap)
+            stale[book] = 0
+
+    def _pop_crossed(self, symbol, book, crossed):
+        heap = self._heaps[symbol][book]
+        triggered = []
+        while heap and crossed(heap[0][0]):
+            _, _, order_id = heapq.heappop(heap)
+            order = self.orders.get(order_id)
+            if order is None:
+                self._stale[symbol][book] -= 1
+            else:
+                order.queued = False
+                triggered.append(order)
+        if triggered:
+            self._compact(symbol, book)
+        return triggered
+
+    def match(self, bid, ask, symbol=0):
+        """
+        Removes and returns the orders of a symbol triggered by a tick.
+
+        Args:
+            bid (float): The bid price of the tick.
+            ask (float): The ask price of the tick.
+            symbol (int): The symbol of the tick.
+
+        Returns:
+            list: The triggered orders, exits first, each group in price-priority order.
+        """
+        if symbol not in self._heaps:
+            return []
+        triggered = (self._pop_crossed(symbol, BUY_LIMIT, lambda key: -key >= ask)
+                     + self._pop_crossed(symbol, BUY_STOP, lambda key: key <= ask)
+                     + self._pop_crossed(symbol, SELL_LIMIT, lambda key: key <= bid)
+                     + self._pop_crossed(symbol, SELL_STOP, lambda key: -key >= bid))
+
+        fired = []
+        for order in triggered:
+            # The other leg of an OCO pair may have triggered on the same tick
+            if order.id not in self.orders:
+                continue
+            self.cancel(order.id)
+            if order.oco is not None:
+                self.cancel(order.oco)
+            fired.append(order)
+        fired.sort(key=lambda order: not order.is_exit)
+        return fired
+
+    def execute(self, portfolio, bid, ask, price_time=None, symbol=0):
+        """
+        Matches a tick against the book and fills the triggered orders on a Portfolio at the tick's prices.
+
+        Exit orders whose position is already closed are dropped.
+
+        Args:
+            portfolio (Portfolio): The portfolio holding the accounts and positions.
+            bid (float or array): Current bid price(s) per symbol.
+            ask (float or array): Current ask price(s) per symbol.
+            price_time (datetime): The time of the tick.
+            symbol (int): The symbol to match.
+
+        Returns:
+            tuple: The ids of the positions opened and closed by triggered orders.
+        """
+        symbol_bid = bid[symbol] if np.ndim(bid) else bid
+        symbol_ask = ask[symbol] if np.ndim(ask) else ask
+        fired = self.match(symbol_bid, symbol_ask, symbol)
+        exits = [order.position for order in fired if order.is_exit and portfolio.is_open[order.position]]
+        entries = [order for order in fired if not order.is_exit]
+
+        closed = np.unique(np.asarray(exits, dtype=np.int64))
+        if len(closed):
+            portfolio.close_many(closed, bid, ask, price_time)
+        opened = np.zeros(0, dtype=np.int64)
+        if entries:
+            opened = portfolio.open_many([order.account for order in entries],
+                                         [order.side for order in entries],
+                                         [order.units for order in entries],
+                                         bid, ask, price_time, [order.symbol for order in entries])
+            opened = opened[opened >= 0]
+        return opened, closed
@@ -0,0 +1,385 @@
+"""
+Array-backed portfolio engine for many accounts with many concurrent positions each.
+
+Account and position state is stored column-wise in NumPy arrays, so marking every position to market
+and refreshing equity, used margin and margin level of every account takes one vectorized pass per tick.
+The formulas follow engine.float_pl_cal and engine.margin_cal.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from engine import PIP, MARGIN_RATE, TradeError
+
+LONG = 1
+SHORT = -1
+
+
+def to_timestamp(price_time):
+    """
+    Converts a datetime, numpy datetime64 or number of seconds to seconds since the epoch.
+    """
+    if price_time is None:
+        return np.nan
+    if isinstance(price_time, datetime):
+        return price_time.timestamp()
+    if isinstance(price_time, np.datetime64):
+        return price_time.astype('datetime64[us]').astype(np.int64) / 1e6
+    return float(price_time)
+
+
+def group_cumsum(values, groups):
+    """
+    Cumulative sum of values restarting at every change of groups (which must be sorted).
+    """
+    if len(values) == 0:
+        return np.zeros(0)
+    total = np.cumsum(values)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    offsets = np.repeat(total[starts] - values[starts], np.diff(np.r_[starts, len(values)]))
+    return total - offsets
+
+
+def side_of(mode):
+    """
+    Converts a trade mode ('long' or 'short') to LONG or SHORT.
+    """
+    if mode in ('long', LONG):
+        return LONG
+    if mode in ('short', SHORT):
+        return SHORT
+    raise TradeError(f"Unknown trade mode {mode!r}")
+
+
+class Portfolio:
+    """
+    Accounts and positions stored as NumPy columns.
+
+    Positions keep their row after being closed, so a position id stays valid for the whole run.
+    Prices are passed per symbol: bid and ask may be scalars when every position trades the same
+    symbol, or arrays indexed by the symbol column of the positions.
+
+    Without cross rates, P/L and margin are in the quote currency, which must then be the account currency.
+    With a currency.CrossRates of the symbols, bid and ask must be arrays over every symbol: P/L is converted
+    from the quote currency and margin from the base currency into the account currency at every tick.
+    """
+
+    def __init__(self, capacity=1024, cross_rates=None):
+        self.cross_rates = cross_rates
+        # Account columns
+        self.n_accounts = 0
+        self.margin_rate = np.zeros(0)
+        self.balance = np.zeros(0)
+        self.equity = np.zeros(0)
+        self.float_pl = np.zeros(0)
+        self.used_margin = np.zeros(0)
+        self.free_margin = np.zeros(0)
+        self.margin_level = np.zeros(0)
+        self.realized_pl = np.zeros(0)
+        # Unrounded margin level keeping the sign of the equity, as of the last mark_to_market
+        self.signed_margin_level = np.zeros(0)
+
+        # Position columns
+        self.n_positions = 0
+        self.account = np.zeros(capacity, dtype=np.int64)
+        self.symbol = np.zeros(capacity, dtype=np.int64)
+        self.side = np.zeros(capacity, dtype=np.int8)
+        self.units = np.zeros(capacity)
+        self.enter_price = np.zeros(capacity)
+        self.enter_time = np.zeros(capacity)
+        self.exit_price = np.zeros(capacity)
+        self.exit_time = np.zeros(capacity)
+        self.position_pl = np.zeros(capacity)
+        self.position_margin = np.zeros(capacity)
+        self.is_open = np.zeros(capacity, dtype=bool)
+        self._refresh_open_index()
+
+    # Accounts
+
+    def add_accounts(self, balances, margin_rates=MARGIN_RATE):
+        """
+        Adds accounts with the given starting balances.
+
+        Args:
+            balances (float or array): One balance per new account.
+            margin_rates (float or array): The fraction of the position value every new account
+                                           must hold as margin.
+
+        Returns:
+            numpy.ndarray: The ids of the new accounts.
+        """
+        balances = np.atleast_1d(np.asarray(balances, dtype=np.float64))
+        first = self.n_accounts
+        self.n_accounts += len(balances)
+        zeros = np.zeros(len(balances))
+        margin_rates = np.broadcast_to(np.asarray(margin_rates, dtype=np.float64), balances.shape)
+        self.margin_rate = np.concatenate([self.margin_rate, margin_rates])
+        self.balance = np.concatenate([self.balance, balances])
+        self.equity = np.concatenate([self.equity, balances])
+        self.float_pl = np.concatenate([self.float_pl, zeros])
+        self.used_margin = np.concatenate([self.used_margin, zeros])
+        self.free_margin = np.concatenate([self.free_margin, balances])
+        self.margin_level = np.concatenate([self.margin_level, np.full(len(balances), np.inf)])
+        self.signed_margin_level = np.concatenate([self.signed_margin_level, np.full(len(balances), np.inf)])
+        self.realized_pl = np.concatenate([self.realized_pl, zeros])
+        return np.arange(first, self.n_accounts)
+
+    def add_account(self, balance, margin_rate=MARGIN_RATE):
+        """
+        Adds one account and returns its id.
+        """
+        return int(self.add_accounts(balance, margin_rate)[0])
+
+    # Positions
+
+    def _grow(self, needed):
+        capacity = len(self.side)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('account', 'symbol', 'side', 'units', 'enter_price', 'enter_time', 'exit_price',
+                     'exit_time', 'position_pl', 'position_margin', 'is_open'):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def _refresh_open_index(self):
+        # Columns of the open positions are gathered once here rather than on every tick
+        positions = np.flatnonzero(self.is_open[:self.n_positions])
+        self._open_index = positions
+        # Writing back through a slice is much cheaper than a scatter when the open rows are contiguous
+        if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+            self._open_rows = slice(int(positions[0]), int(positions[-1]) + 1)
+        else:
+            self._open_rows = positions
+        self._open_account = self.account[positions]
+        self._open_symbol = self.symbol[positions]
+        self._open_long = self.side[positions] == LONG
+        self._open_sign_pips = self.side[positions] * 10000.0
+        self._open_enter = self.enter_price[positions]
+        self._open_pip_units = PIP * self.units[positions]
+        self._open_margin_units = self.margin_rate[self._open_account] * self.units[positions]
+
+    @property
+    def open_positions(self):
+        """
+        The ids of the open positions, in ascending order.
+        """
+        return self._open_index
+
+    def open_many(self, accounts, modes, units, bid, ask, price_time=None, symbols=0):
+        """
+        Opens market positions in bulk; long positions fill at the ask, short positions at the bid.
+
+        Orders are checked against the free margin of the last mark_to_market in submission order:
+        once the cumulative margin of an account's orders exceeds its free margin, the rest are rejected.
+
+        Args:
+            accounts (array): The account of every new position.
+            modes (array): LONG/SHORT (or 'long'/'short') for every new position.
+            units (array): The number of units of every new position.
+            bid (float or array): Current bid price(s) per symbol.
+            ask (float or array): Current ask price(s) per symbol.
+            price_time (datetime): The time of the fill.
+            symbols (int or array): The symbol of every new position.
+
+        Returns:
+            numpy.ndarray: The ids of the new positions, -1 where the position was rejected.
+        """
+        accounts = np.atleast_1d(np.asarray(accounts, dtype=np.int64))
+        count = len(accounts)
+        modes = np.broadcast_to(np.asarray(modes), (count,))
+        if modes.dtype.kind in 'US':
+            sides = np.where(modes == 'long', LONG, SHORT).astype(np.int8)
+        else:
+            sides = modes.astype(np.int8)
+        units = np.broadcast_to(np.asarray(units, dtype=np.float64), (count,))
+        symbols = np.broadcast_to(np.asarray(symbols, dtype=np.int64), (count,))
+        if np.any(units <= 0):
+            raise TradeError("Wrong Number !")
+
+        bid_all = bid = np.asarray(bid, dtype=np.float64)
+        ask_all = ask = np.asarray(ask, dtype=np.float64)
+        bid = bid[symbols] if bid.ndim else np.broadcast_to(bid, (count,))
+        ask = ask[symbols] if ask.ndim else np.broadcast_to(ask, (count,))
+        fill_price = np.where(sides == LONG, ask, bid)
+        if self.cross_rates is None:
+            margin = self.margin_rate[accounts] * fill_price * units
+        else:
+            _, base_rate = self._rates(bid_all, ask_all)
+            margin = self.margin_rate[accounts] * base_rate[symbols] * units
+
+        order = np.argsort(accounts, kind='stable')
+        cumulative = np.empty(count)
+        cumulative[order] = group_cumsum(margin[order], accounts[order])
+        accepted = cumulative <= self.free_margin[accounts]
+        ids = np.full(count, -1, dtype=np.int64)
+        new = int(accepted.sum())
+        if new == 0:
+            return ids
+
+        first = self.n_positions
+        self._grow(first + new)
+        rows = slice(first, first + new)
+        self.account[rows] = accounts[accepted]
+        self.symbol[rows] = symbols[accepted]
+        self.side[rows] = sides[accepted]
+        self.units[rows] = units[accepted]
+        self.enter_price[rows] = fill_price[accepted]
+        self.enter_time[rows] = to_timestamp(price_time)
+        self.exit_price[rows] = np.nan
+        self.exit_time[rows] = np.nan
+        self.position_pl[rows] = 0
+        self.position_margin[rows] = margin[accepted]
+        self.is_open[rows] = True
+        self.n_positions += new
+        ids[accepted] = np.arange(first, first + new)
+
+        np.add.at(self.used_margin, accounts[accepted], margin[accepted])
+        self.free_margin = self.equity - self.used_margin
+        self._refresh_open_index()
+        return ids
+
+    def open_position(self, account, mode, units, bid, ask, price_time=None, symbol=0):
+        """
+        Opens one market position.
+
+        Returns:
+            int: The id of the new position.
+        """
+        position = int(self.open_many([account], [side_of(mode)], [units], bid, ask, price_time, [symbol])[0])
+        if position < 0:
+            raise TradeError("Not enough Funds !")
+        return position
+
+    def close_many(self, positions, bid, ask, price_time=None):
+        """
+        Closes positions at the current prices (long at the bid, short at the ask) and realizes their P/L.
+
+        Args:
+            positions (array): The ids of the positions to close.
+            bid (float or array): Current bid price(s) per symbol.
+            ask (float or array): Current ask price(s) per symbol.
+            price_time (datetime): The time of the fill.
+
+        Returns:
+            numpy.ndarray: The realized profit/loss of every closed position.
+        """
+        positions = np.atleast_1d(np.asarray(positions, dtype=np.int64))
+        if np.any(positions >= self.n_positions) or not np.all(self.is_open[positions]):
+            raise TradeError("No Trade in progress")
+        pl, _ = self._evaluate(positions, bid, ask)
+        exit_price = self._close_price(positions, bid, ask)
+
+        self.exit_price[positions] = exit_price
+        self.exit_time[positions] = to_timestamp(price_time)
+        self.position_pl[positions] = pl
+        self.position_margin[positions] = 0
+        self.is_open[positions] = False
+        accounts = self.account[positions]
+        np.add.at(self.balance, accounts, pl)
+        np.add.at(self.realized_pl, accounts, pl)
+        self._refresh_open_index()
+        self.mark_to_market(bid, ask)
+        return pl
+
+    def close_position(self, position, bid, ask, price_time=None):
+        """
+        Closes one position and returns its realized profit/loss.
+        """
+        return float(self.close_many([position], bid, ask, price_time)[0])
+
+    # Valuation
+
+    def _rates(self, bid, ask):
+        # Account-currency value of one unit of every symbol's quote and base currency
+        mids = (np.asarray(bid, dtype=np.float64) + np.asarray(ask, dtype=np.float64)) / 2
+        return self.cross_rates.quote_to_account(mids), self.cross_rates.base_to_account(mids)
+
+    def _prices(self, positions, bid, ask):
+        bid = np.asarray(bid, dtype=np.float64)
+        ask = np.asarray(ask, dtype=np.float64)
+        if bid.ndim:
+            symbols = self.symbol[positions]
+            bid = bid[symbols]
+            ask = ask[symbols]
+        return bid, ask
+
+    def _close_price(self, positions, bid, ask):
+        bid, ask = self._prices(positions, bid, ask)
+        return np.where(self.side[positions] == LONG, bid, ask)
+
+    def _evaluate(self, positions, bid, ask):
+        symbol_bid, symbol_ask = self._prices(positions, bid, ask)
+        long = self.side[positions] == LONG
+        diff = np.where(long, symbol_bid, symbol_ask) - self.enter_price[positions]
+        # Same pip rounding as engine.float_pl_cal
+        pl = np.round(diff * self.side[positions] * 10000, 4) * PIP * self.units[positions]
+        margin_units = self.margin_rate[self.account[positions]] * self.units[positions]
+        if self.cross_rates is None:
+            return pl, margin_units * np.where(long, symbol_ask, symbol_bid)
+        quote_rate, base_rate = self._rates(bid, ask)
+        symbols = self.symbol[positions]
+        return pl * quote_rate[symbols], margin_units * base_rate[symbols]
+
+    def mark_to_market(self, bid, ask):
+        """
+        Marks every open position to market and refreshes the figures of every account.
+
+        Accounts without open positions get an infinite margin level.
+
+        Args:
+            bid (float or array): Current bid price(s) per symbol.
+            ask (float or array): Current ask price(s) per symbol.
+
+        Returns:
+            numpy.ndarray: The margin level of every account.
+        """
+        positions = self._open_rows
+        bid = np.asarray(bid, dtype=np.float64)
+        ask = np.asarray(ask, dtype=np.float64)
+        if self.cross_rates is not None:
+            quote_rate, base_rate = self._rates(bid, ask)
+        if bid.ndim:
+            bid = bid[self._open_symbol]
+            ask = ask[self._open_symbol]
+        long = self._open_long
+
+        # Same formulas as _evaluate, on the cached columns of the open positions
+        pl = np.where(long, bid, ask)
+        pl -= self._open_enter
+        pl *= self._open_sign_pips
+        np.round(pl, 4, out=pl)
+        pl *= self._open_pip_units
+        if self.cross_rates is None:
+            margin = np.where(long, ask, bid)
+            margin *= self._open_margin_units
+        else:
+            pl *= quote_rate[self._open_symbol]
+            margin = base_rate[self._open_symbol] * self._open_margin_units
+        self.position_pl[positions] = pl
+        self.position_margin[positions] = margin
+
+        accounts = self._open_account
+        self.float_pl = np.bincount(accounts, weights=pl, minlength=self.n_accounts)
+        self.used_margin = np.bincount(accounts, weights=margin, minlength=self.n_accounts)
+        self.equity = self.balance + self.float_pl
+        self.free_margin = self.equity - self.used_margin
+        level = np.divide(self.equity, self.used_margin, out=np.full(self.n_accounts, np.inf),
+                          where=self.used_margin > 0)
+        level *= 100
+        self.signed_margin_level = level
+        self.margin_level = np.round(level, 2)
+        np.abs(self.margin_level, out=self.margin_level)
+        return self.margin_level
+
+    def status(self, account):
+        """
+        Returns the figures of one account in the order of engine.STATUS_COLUMNS.
+        """
+        return [float(self.balance[account]), float(self.equity[account]), float(self.float_pl[account]),
+                float(self.used_margin[account]), float(self.free_margin[account]),
+                float(self.margin_level[account]), float(self.realized_pl[account])]
@@ -1,8 +1,12 @@
 import random
 from datetime import datetime
+from queue import Full
+import numpy as np
+from clock import RealTimeClock
+from metrics import METRICS
 
 
-def price_generator(last_bid_price, last_ask_price, first_run=False):
+def price_generator(last_bid_price, last_ask_price, first_run=False, clock=None):
     """
     Generates a new bid and ask price based on the last prices and a random offset.
 
@@ -11,6 +15,7 @@ def price_generator(last_bid_price, last_ask_price, first_run=False):
         last_ask_price (float): The last recorded ask price.
         first_run (bool): If True, generates initial random prices within a range; 
                           if False, generates new prices based on the last bid and ask prices.
+        clock (RealTimeClock): The clock used to timestamp the prices, defaults to the wall clock.
 
     Returns:
         tuple: A tuple containing the new bid price, new ask price, and the current timestamp.
@@ -29,29 +34,167 @@ def price_generator(last_bid_price, last_ask_price, first_run=False):
     new_bid_price = max(new_bid_price, 0.0001)
     new_ask_price = max(new_ask_price, 0.0001)
     
-    current_time = datetime.now()
+    current_time = datetime.now() if clock is None else clock.now()
     return new_bid_price, new_ask_price, current_time
 
-def price_generator_thread(queue, stop_event, interval=5, first_run=False):
+def price_paths(n_ticks, n_paths=1, interval=5, start_time=None, seed=None,
+                start_bid=None, start_ask=None):
+    """
+    Generates N ticks for M independent price paths in a single vectorized call.
+
+    Follows the same random-offset model as price_generator: every tick moves bid and ask by the
+    same offset drawn uniformly within 10 % of the average of the last bid and ask prices.
+    Because the offset is proportional to the mid price, the mid price of a path is the cumulative
+    product of (1 + 0.1 * u) with u ~ U(-1, 1), and the spread stays constant.
+
+    Args:
+        n_ticks (int): Number of ticks to generate for every path.
+        n_paths (int): Number of independent paths.
+        interval (float): Time interval (in seconds) between two ticks.
+        start_time (datetime): Timestamp of the first tick, defaults to the current time.
+        seed (int or numpy.random.Generator): Seed or generator used for the random draws.
+        start_bid (float or array): Bid price(s) before the first tick; drawn like the first run of
+                                    price_generator when omitted.
+        start_ask (float or array): Ask price(s) before the first tick; drawn like the first run of
+                                    price_generator when omitted.
+
+    Returns:
+        tuple: C-contiguous arrays of bid prices and ask prices with shape (n_paths, n_ticks),
+               and a datetime64 array of the n_ticks timestamps.
+    """
+    rng = np.random.default_rng(seed)
+    if start_bid is None:
+        start_bid = rng.uniform(.9, 1.2, n_paths)
+    if start_ask is None:
+        start_ask = start_bid + rng.uniform(0.0001, 0.01, n_paths)
+    start_bid = np.broadcast_to(np.asarray(start_bid, dtype=np.float64), (n_paths,))
+    start_ask = np.broadcast_to(np.asarray(start_ask, dtype=np.float64), (n_paths,))
+
+    start_mid = (start_bid + start_ask) / 2
+    half_spread = (start_ask - start_bid) / 2
+    growth = rng.uniform(-0.1, 0.1, (n_paths, n_ticks))
+    growth += 1
+    mid = np.cumprod(growth, axis=1)
+    mid *= start_mid[:, None]
+
+    bid = np.round(mid - half_spread[:, None], 4)
+    ask = np.round(mid + half_spread[:, None], 4)
+    np.maximum(bid, 0.0001, out=bid)
+    np.maximum(ask, 0.0001, out=ask)
+
+    if start_time is None:
+        start_time = datetime.now()
+    step = np.timedelta64(int(round(interval * 1e6)), 'us')
+    times = np.datetime64(start_time, 'us') + step * np.arange(n_ticks)
+    return bid, ask, times
+
+
+def _erf(x):
+    # Abramowitz and Stegun 7.1.26, absolute error below 1.5e-7
+    t = 1 / (1 + 0.3275911 * np.abs(x))
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return np.sign(x) * (1 - poly * np.exp(-x * x))
+
+
+def _copula_factor(corr):
+    """
+    Returns L with L @ L.T equal to the latent normal correlation giving uniform offsets correlated by `corr`.
+    """
+    latent = 2 * np.sin(np.pi / 6 * np.asarray(corr, dtype=np.float64))
+    try:
+        return np.linalg.cholesky(latent)
+    except np.linalg.LinAlgError:
+        # Singular (e.g. perfectly correlated pairs) or not a correlation matrix at all
+        eigenvalues, eigenvectors = np.linalg.eigh(latent)
+        if eigenvalues.min() < -1e-8 * len(latent):
+            raise ValueError("corr is not a valid correlation matrix: it is not positive semi-definite")
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+
+def correlated_price_paths(n_ticks, start_bid, start_ask, corr=None, volatility=0.1, seed=None, decimals=4):
+    """
+    Generates N ticks for several currency pairs at once, with correlated price moves.
+
+    Each pair follows the random-offset model of price_generator: the mid price moves by a uniform relative
+    offset in [-volatility, volatility] and the spread stays constant. The offsets of the pairs are tied
+    together by a Gaussian copula, so every pair keeps its uniform offsets while their (Pearson) correlation
+    follows the given matrix: the latent normal correlation is set to 2 sin(pi rho / 6), the inverse of the
+    (6 / pi) asin(rho / 2) the copula maps it to.
+
+    Args:
+        n_ticks (int): Number of ticks to generate.
+        start_bid (array): Bid price of every pair before the first tick.
+        start_ask (array): Ask price of every pair before the first tick.
+        corr (array): Correlation matrix of the pairs' moves, independent pairs when omitted. Singular
+                      matrices (pairs with a correlation of +-1) are allowed.
+        volatility (float): Largest relative move of a pair in one tick (0.1 in price_generator).
+        seed (int or numpy.random.Generator): Seed or generator used for the random draws.
+        decimals (int or array): Number of decimals every pair is quoted with.
+
+    Returns:
+        tuple: Arrays of bid prices and ask prices with shape (n_ticks, n_pairs).
+    """
+    rng = np.random.default_rng(seed)
+    start_bid = np.asarray(start_bid, dtype=np.float64)
+    start_ask = np.asarray(start_ask, dtype=np.float64)
+    n_pairs = len(start_bid)
+
+    normal = rng.standard_normal((n_ticks, n_pairs))
+    if corr is not None:
+        normal = normal @ _copula_factor(corr).T
+    growth = _erf(normal / np.sqrt(2))
+    growth *= volatility
+    growth += 1
+    mid = np.cumprod(growth, axis=0)
+    mid *= (start_bid + start_ask) / 2
+
+    scale = np.power(10.0, np.broadcast_to(decimals, (n_pairs,)))
+    half_spread = (start_ask - start_bid) / 2
+    bid = np.round((mid - half_spread) * scale) / scale
+    ask = np.round((mid + half_spread) * scale) / scale
+    np.maximum(bid, 1 / scale, out=bid)
+    np.maximum(ask, 1 / scale, out=ask)
+    return bid, ask
+
+
+def price_generator_thread(queue, stop_event, interval=5, first_run=False, clock=None, store=None, start=None):
     """
     Continuously generates and updates bid/ask prices in a separate thread.
 
     Args:
         queue (Queue): A queue object to store the generated prices.
         stop_event (Event): An event used to stop the thread when needed.
-        interval (int): Time interval (in seconds) between price updates.
+        interval (int): Time interval (in clock seconds) between price updates.
         first_run (bool): If True, generates the first set of prices; otherwise, it updates prices.
+        clock (RealTimeClock): The clock pacing the updates, defaults to the wall clock.
+        store (TickStore): If given, every generated tick is also appended to this store.
+        start (tuple): (bid, ask) prices to continue the walk from, e.g. after restoring a snapshot.
+
+    When the queue is bounded and full, new ticks are dropped and counted in the 'dropped_ticks' metric
+    rather than blocking the generator.
     """
+    if clock is None:
+        clock = RealTimeClock()
     last_bid_price = 0
     last_ask_price = 0
+    if start is not None:
+        last_bid_price, last_ask_price = start
+        first_run = False
     while not stop_event.is_set():
-        new_bid_price, new_ask_price, current_time = price_generator(last_bid_price, last_ask_price, first_run)
+        new_bid_price, new_ask_price, current_time = price_generator(last_bid_price, last_ask_price, first_run, clock)
         if not first_run:
-            queue.put((new_bid_price, new_ask_price, current_time))
+            try:
+                queue.put_nowait((new_bid_price, new_ask_price, current_time))
+            except Full:
+                METRICS.count('dropped_ticks')
+            if store is not None:
+                store.append(new_bid_price, new_ask_price, current_time)
         last_bid_price = new_bid_price
         last_ask_price = new_ask_price
         first_run = False
-        stop_event.wait(interval)
+        clock.wait(stop_event, interval)
+    if store is not None:
+        store.flush()
 
 
 def process_price(prices):
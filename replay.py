@@ -0,0 +1,176 @@
+"""
+Historical data replay.
+
+Streams recorded bid/ask ticks from CSV files or TickStore files in fixed-size chunks, so memory use stays
+constant whatever the size of the file. Time-range seeking uses a sparse index: for CSV files a sidecar
+`<file>.idx.npy` with the time and byte offset of every `every`-th row, for TickStore files a binary search
+on the memory-mapped time column.
+
+replay_thread is a drop-in replacement for price.price_generator_thread that feeds the same
+(bid, ask, time) tuples into a queue, paced by a clock from clock.py.
+"""
+
+import os
+from queue import Full
+
+import numpy as np
+import pandas as pd
+
+from clock import RealTimeClock
+from metrics import METRICS
+from tickstore import TickStore, to_datetime64
+
+INDEX_DTYPE = np.dtype([('time', '<M8[us]'), ('offset', '<i8')])
+
+
+def index_path(path):
+    return path + '.idx.npy'
+
+
+def build_csv_index(path, every=100000, time_column='time'):
+    """
+    Builds and saves the sparse seek index of a CSV tick file.
+
+    Args:
+        path (str): The CSV file, with a header line and rows in time order.
+        every (int): Index one row out of `every`.
+        time_column (str): The name of the time column.
+
+    Returns:
+        numpy.ndarray: The index records (time, byte offset of the row).
+    """
+    entries = []
+    with open(path, 'rb') as f:
+        header = f.readline().decode().strip().split(',')
+        column = header.index(time_column)
+        row = 0
+        offset = f.tell()
+        for line in f:
+            if row % every == 0:
+                entries.append((to_datetime64(line.decode().split(',')[column].strip()), offset))
+            offset += len(line)
+            row += 1
+    index = np.array(entries, dtype=INDEX_DTYPE)
+    np.save(index_path(path), index)
+    return index
+
+
+def load_csv_index(path, every=100000, time_column='time'):
+    """
+    Loads the seek index of a CSV file, building it if it is missing or older than the file.
+    """
+    idx = index_path(path)
+    if os.path.exists(idx) and os.path.getmtime(idx) >= os.path.getmtime(path):
+        return np.load(idx)
+    return build_csv_index(path, every, time_column)
+
+
+def iter_csv_chunks(path, start=None, end=None, chunksize=100000, time_column='time',
+                    bid_column='bid', ask_column='ask', use_index=True):
+    """
+    Reads a CSV tick file chunk by chunk.
+
+    Args:
+        path (str): The CSV file, with a header line and rows in time order.
+        start (datetime): Skip ticks before this time.
+        end (datetime): Stop before this time.
+        chunksize (int): The number of rows read at once.
+        time_column (str): The name of the time column.
+        bid_column (str): The name of the bid column.
+        ask_column (str): The name of the ask column.
+        use_index (bool): Seek to `start` through the sparse index instead of scanning from the top.
+
+    Yields:
+        tuple: Arrays of bid prices, ask prices and datetime64 times of one chunk.
+    """
+    start = None if start is None else to_datetime64(start)
+    end = None if end is None else to_datetime64(end)
+    with open(path, 'rb') as f:
+        header = f.readline().decode().strip().split(',')
+        if start is not None and use_index:
+            index = load_csv_index(path, time_column=time_column)
+            position = int(np.searchsorted(index['time'], start, 'right')) - 1
+            if position >= 0:
+                f.seek(int(index['offset'][position]))
+
+        reader = pd.read_csv(f, names=header, header=None, chunksize=chunksize,
+                             usecols=[time_column, bid_column, ask_column])
+        for chunk in reader:
+            times = pd.to_datetime(chunk[time_column]).to_numpy().astype('datetime64[us]')
+            bid = chunk[bid_column].to_numpy(dtype=np.float64)
+            ask = chunk[ask_column].to_numpy(dtype=np.float64)
+            first, last = 0, len(times)
+            if start is not None:
+                first = int(np.searchsorted(times, start, 'left'))
+            if end is not None:
+                last = int(np.searchsorted(times, end, 'left'))
+            if first < last:
+                yield bid[first:last], ask[first:last], times[first:last]
+            if last < len(times):
+                return
+
+
+def iter_store_chunks(store, start=None, end=None, chunksize=100000):
+    """
+    Reads a TickStore (or the path of a tick file) chunk by chunk through its memory map.
+
+    Yields:
+        tuple: Arrays of bid prices, ask prices and datetime64 times of one chunk.
+    """
+    if isinstance(store, str):
+        store = TickStore(store)
+    records = store.between(start, end)
+    for first in range(0, len(records), chunksize):
+        chunk = records[first:first + chunksize]
+        yield np.asarray(chunk['bid']), np.asarray(chunk['ask']), np.asarray(chunk['time'])
+
+
+def iter_chunks(path, start=None, end=None, chunksize=100000):
+    """
+    Reads a CSV file or a TickStore file chunk by chunk, depending on the file extension.
+    """
+    if path.lower().endswith('.csv'):
+        return iter_csv_chunks(path, start, end, chunksize)
+    return iter_store_chunks(path, start, end, chunksize)
+
+
+def iter_ticks(path, start=None, end=None, chunksize=100000):
+    """
+    Streams the ticks of a CSV file or a TickStore file as (bid, ask, time) tuples,
+    the format produced by price.price_generator.
+    """
+    for bid, ask, times in iter_chunks(path, start, end, chunksize):
+        yield from zip(bid.tolist(), ask.tolist(), times.tolist())
+
+
+def replay_thread(queue, stop_event, ticks, clock=None, put_timeout=0.1):
+    """
+    Feeds recorded ticks into a queue, keeping their original spacing on the given clock.
+
+    Args:
+        queue (Queue): A queue object to store the replayed prices.
+        stop_event (Event): An event used to stop the thread when needed.
+        ticks (iterable): (bid, ask, time) tuples in time order.
+        clock (RealTimeClock): The clock pacing the replay; a FastClock replays as fast as possible.
+        put_timeout (float): Seconds to wait for room in a full queue before checking stop_event again.
+
+    Recorded ticks are never dropped: when the queue is bounded and full the replay waits for the consumer,
+    counting every wait in the 'replay_backpressure' metric, and gives up as soon as stop_event is set.
+    """
+    if clock is None:
+        clock = RealTimeClock()
+    last_time = None
+    for bid_price, ask_price, price_time in ticks:
+        if last_time is not None:
+            delay = (price_time - last_time).total_seconds()
+            if delay > 0 and clock.wait(stop_event, delay):
+                break
+        while not stop_event.is_set():
+            try:
+                queue.put((bid_price, ask_price, price_time), timeout=put_timeout)
+                break
+            except Full:
+                METRICS.count('replay_backpressure')
+        else:
+            break
+        last_time = price_time
@@ -0,0 +1,305 @@
+"""
+Snapshot and restore of the simulator state.
+
+A Snapshot captures the account and its open position, the candle buffers, the trade journal, a Portfolio,
+the state of the random generators driving the price feed and any extra JSON-serializable values. Scalars go
+to a small JSON header and everything column-shaped to NumPy arrays, written together as one uncompressed
+.npz file, so restoring is a handful of array copies rather than a replay of the ticks.
+
+Every restore call builds new objects, so many runs can fork from one warm state:
+
+    warm = Snapshot.capture(account=account, candles=candles).to_bytes()
+    for seed in seeds:
+        account = Snapshot.from_bytes(warm).account()
+"""
+
+import io
+import json
+import os
+import random
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from candles import Candle, MultiCandleBuilder
+from engine import Account, Position
+from journal import Journal
+from multifeed import MultiSymbolFeed
+from portfolio import Portfolio
+
+VERSION = 1
+CANDLE_STATE_DTYPE = np.dtype([('time', '<M8[us]'), ('end_time', '<M8[us]'),
+                               ('bid_open', '<f8'), ('bid_high', '<f8'), ('bid_low', '<f8'), ('bid_close', '<f8'),
+                               ('ask_open', '<f8'), ('ask_high', '<f8'), ('ask_low', '<f8'), ('ask_close', '<f8'),
+                               ('volume', '<i8')])
+PORTFOLIO_ACCOUNT_COLUMNS = ('margin_rate', 'balance', 'equity', 'float_pl', 'used_margin', 'free_margin',
+                             'margin_level', 'realized_pl')
+PORTFOLIO_POSITION_COLUMNS = ('account', 'symbol', 'side', 'units', 'enter_price', 'enter_time', 'exit_price',
+                              'exit_time', 'position_pl', 'position_margin', 'is_open')
+POSITION_FIELDS = ('mode', 'units_to_trade', 'enter_bid_price', 'enter_ask_price', 'base_curr', 'quote_curr',
+                   'enter_time', 'exit_bid_price', 'exit_ask_price', 'exit_time', 'realized_pl', 'used_margin',
+                   'margin_level')
+ACCOUNT_FIELDS = ('balance', 'margin_rate', 'account_currency', 'equity', 'float_pl', 'used_margin',
+                  'free_margin', 'margin_level', 'realize_PL', 'last_bid_price', 'last_ask_price', 'last_time')
+
+
+def _to_json(value):
+    if isinstance(value, np.datetime64):
+        # Nanosecond datetime64 values convert to int, not datetime
+        value = value.astype('datetime64[us]')
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, datetime):
+        return {'datetime': value.isoformat()}
+    return value
+
+
+def _from_json(value):
+    if isinstance(value, dict) and set(value) == {'datetime'}:
+        return datetime.fromisoformat(value['datetime'])
+    return value
+
+
+def _datetime64(value):
+    return np.datetime64('NaT', 'us') if value is None else np.datetime64(value, 'us')
+
+
+def _datetime(value):
+    return None if np.isnat(value) else value.astype(datetime)
+
+
+def _position_state(position):
+    if position is None:
+        return None
+    return {name: _to_json(getattr(position, name)) for name in POSITION_FIELDS}
+
+
+def _restore_position(state):
+    if state is None:
+        return None
+    position = Position(state['mode'], state['units_to_trade'], state['enter_bid_price'], state['enter_ask_price'],
+                        state['base_curr'], state['quote_curr'], _from_json(state['enter_time']))
+    for name in POSITION_FIELDS[7:]:
+        setattr(position, name, _from_json(state[name]))
+    return position
+
+
+def _candle_record(candle):
+    return (_datetime64(candle.time), _datetime64(candle.end_time), candle.bid_open, candle.bid_high,
+            candle.bid_low, candle.bid_close, candle.ask_open, candle.ask_high, candle.ask_low, candle.ask_close,
+            candle.volume)
+
+
+def _restore_candle(record):
+    candle = Candle(_datetime(record['time']), float(record['bid_open']), float(record['ask_open']),
+                    _datetime(record['end_time']))
+    candle.bid_high = float(record['bid_high'])
+    candle.bid_low = float(record['bid_low'])
+    candle.bid_close = float(record['bid_close'])
+    candle.ask_high = float(record['ask_high'])
+    candle.ask_low = float(record['ask_low'])
+    candle.ask_close = float(record['ask_close'])
+    candle.volume = int(record['volume'])
+    return candle
+
+
+class Snapshot:
+    """
+    The state of a simulation at one point in time.
+
+    Attributes:
+        meta (dict): JSON-serializable scalars, including the 'extra' values given to capture.
+        arrays (dict): NumPy arrays by name.
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+
+    @classmethod
+    def capture(cls, account=None, candles=None, journal=None, portfolio=None, feed=None, rng=random,
+                **extra):
+        """
+        Captures the state of the given objects.
+
+        Args:
+            account (Account): An engine account, with its open position and last prices.
+            candles (MultiCandleBuilder): The candle buffers, including the candles still forming.
+            journal (Journal): The trade and equity journal.
+            portfolio (Portfolio): A multi-account portfolio.
+            feed (MultiSymbolFeed): A multi-symbol feed, with its generator state and pre-generated ticks.
+            rng (random.Random): The generator behind price.price_generator, the `random` module by default;
+                                 None to leave it out.
+            **extra: Other JSON-serializable values to keep, such as the clock time.
+        """
+        meta = {'version': VERSION, 'extra': {name: _to_json(value) for name, value in extra.items()}}
+        arrays = {}
+        if account is not None:
+            meta['account'] = {name: _to_json(getattr(account, name)) for name in ACCOUNT_FIELDS}
+            meta['account']['position'] = _position_state(account.position)
+            meta['account']['last_closed'] = _position_state(account.last_closed)
+        if candles is not None:
+            meta['candles'] = []
+            for timeframe, builder in candles.builders.items():
+                records = [_candle_record(candle) for candle in builder.candles]
+                if builder.current is not None:
+                    records.append(_candle_record(builder.current))
+                meta['candles'].append({'timeframe': timeframe, 'maxlen': builder.candles.maxlen,
+                                        'origin': builder.origin, 'bucket': builder._bucket,
+                                        'forming': builder.current is not None})
+                arrays[f'candles_{timeframe}'] = np.array(records, dtype=CANDLE_STATE_DTYPE)
+        if journal is not None:
+            meta['journal'] = True
+            arrays['journal_trades'] = journal.trades.records.copy()
+            arrays['journal_equity'] = journal.equity.records.copy()
+        if portfolio is not None:
+            meta['portfolio'] = {'n_accounts': portfolio.n_accounts, 'n_positions': portfolio.n_positions}
+            for name in PORTFOLIO_ACCOUNT_COLUMNS:
+                arrays[f'portfolio_{name}'] = getattr(portfolio, name).copy()
+            for name in PORTFOLIO_POSITION_COLUMNS:
+                arrays[f'portfolio_{name}'] = getattr(portfolio, name)[:portfolio.n_positions].copy()
+        if feed is not None:
+            meta['feed'] = {'symbols': feed.symbols, 'volatility': feed.volatility,
+                            'decimals': np.asarray(feed.decimals).tolist(), 'chunk': feed.chunk,
+                            'next': feed._next, 'rng': feed.rng.bit_generator.state}
+            arrays['feed_bid'] = feed.bid.copy()
+            arrays['feed_ask'] = feed.ask.copy()
+            arrays['feed_bids'] = feed._bids.copy()
+            arrays['feed_asks'] = feed._asks.copy()
+            if feed.corr is not None:
+                arrays['feed_corr'] = np.asarray(feed.corr, dtype=np.float64)
+        if rng is not None:
+            version, internal, gauss_next = rng.getstate()
+            meta['random'] = {'version': version, 'gauss_next': gauss_next}
+            arrays['random_state'] = np.array(internal, dtype=np.uint32)
+        return cls(meta, arrays)
+
+    # Serialization
+
+    def to_bytes(self):
+        """
+        Returns the snapshot as the bytes of an uncompressed .npz archive.
+        """
+        buffer = io.BytesIO()
+        header = np.frombuffer(json.dumps(self.meta).encode(), dtype=np.uint8)
+        np.savez(buffer, meta=header, **self.arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data)) as archive:
+            arrays = {name: archive[name] for name in archive.files}
+        meta = json.loads(arrays.pop('meta').tobytes().decode())
+        if meta.get('version') != VERSION:
+            raise ValueError(f"Unsupported snapshot version {meta.get('version')}")
+        return cls(meta, arrays)
+
+    def save(self, path):
+        """
+        Writes the snapshot to a file, replacing it atomically.
+        """
+        temp = path + '.tmp'
+        with open(temp, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    # Restore
+
+    @property
+    def extra(self):
+        return {name: _from_json(value) for name, value in self.meta['extra'].items()}
+
+    def account(self):
+        """
+        Returns a new Account in the captured state, or None if no account was captured.
+        """
+        state = self.meta.get('account')
+        if state is None:
+            return None
+        account = Account(state['balance'], state['margin_rate'], state['account_currency'])
+        for name in ACCOUNT_FIELDS[3:]:
+            setattr(account, name, _from_json(state[name]))
+        account.position = _restore_position(state['position'])
+        account.last_closed = _restore_position(state['last_closed'])
+        return account
+
+    def candles(self):
+        """
+        Returns a new MultiCandleBuilder holding the captured candles, or None.
+        """
+        states = self.meta.get('candles')
+        if states is None:
+            return None
+        builder = MultiCandleBuilder([state['timeframe'] for state in states])
+        for state in states:
+            timeframe = state['timeframe']
+            candles = [_restore_candle(record) for record in self.arrays[f'candles_{timeframe}']]
+            single = builder[timeframe]
+            single.origin = state['origin']
+            single._bucket = state['bucket']
+            single.current = candles.pop() if state['forming'] else None
+            single.candles = deque(candles, maxlen=state['maxlen'])
+        return builder
+
+    def journal(self):
+        """
+        Returns a new Journal holding the captured trades and equity curve, or None.
+        """
+        if not self.meta.get('journal'):
+            return None
+        journal = Journal()
+        for buffer, records in ((journal.trades, self.arrays['journal_trades']),
+                                (journal.equity, self.arrays['journal_equity'])):
+            buffer._data = np.zeros(max(len(records), 1), dtype=buffer.dtype)
+            buffer._data[:len(records)] = records
+            buffer.n = len(records)
+        return journal
+
+    def portfolio(self, cross_rates=None):
+        """
+        Returns a new Portfolio in the captured state, or None.
+        """
+        state = self.meta.get('portfolio')
+        if state is None:
+            return None
+        portfolio = Portfolio(max(state['n_positions'], 1), cross_rates)
+        portfolio.n_accounts = state['n_accounts']
+        portfolio.n_positions = state['n_positions']
+        for name in PORTFOLIO_ACCOUNT_COLUMNS:
+            setattr(portfolio, name, self.arrays[f'portfolio_{name}'].copy())
+        for name in PORTFOLIO_POSITION_COLUMNS:
+            getattr(portfolio, name)[:portfolio.n_positions] = self.arrays[f'portfolio_{name}']
+        portfolio._refresh_open_index()
+        return portfolio
+
+    def feed(self):
+        """
+        Returns a new MultiSymbolFeed that continues with the exact ticks the captured one would have produced.
+        """
+        state = self.meta.get('feed')
+        if state is None:
+            return None
+        feed = MultiSymbolFeed(state['symbols'], self.arrays['feed_bid'].copy(), self.arrays['feed_ask'].copy(),
+                               self.arrays.get('feed_corr'), state['volatility'], state['decimals'],
+                               chunk=state['chunk'])
+        feed.rng.bit_generator.state = state['rng']
+        feed._bids = self.arrays['feed_bids'].copy()
+        feed._asks = self.arrays['feed_asks'].copy()
+        feed._next = state['next']
+        return feed
+
+    def restore_random(self, rng=random):
+        """
+        Puts a random.Random (the `random` module by default) back in the captured state.
+        """
+        state = self.meta.get('random')
+        if state is None:
+            return
+        internal = tuple(int(value) for value in self.arrays['random_state'])
+        rng.setstate((state['version'], internal, state['gauss_next']))
@@ -0,0 +1,95 @@
+"""
+Example strategies for backtest.py.
+
+Usage:
+    python backtest.py strategies:MovingAverageCross --param fast=5,10 --param slow=30,60
+"""
+
+from backtest import Strategy, close, market
+from indicators import EMA, RSI
+
+PIP_SIZE = 0.0001
+
+
+def exits(mode, entry, stop_loss, take_profit):
+    """
+    Converts stop-loss and take-profit distances in pips to prices for a position entered at `entry`.
+    """
+    sign = 1 if mode == 'long' else -1
+    stop_price = entry - sign * stop_loss * PIP_SIZE if stop_loss else None
+    take_price = entry + sign * take_profit * PIP_SIZE if take_profit else None
+    return stop_price, take_price
+
+
+class MovingAverageCross(Strategy):
+    """
+    Always in the market on the side of the fast EMA of the candle closes relative to the slow one.
+
+    Params:
+        fast (int): Period of the fast EMA, in candles.
+        slow (int): Period of the slow EMA, in candles.
+        units (float): Units of every position.
+        stop_loss (float): Stop-loss distance in pips, none when 0.
+        take_profit (float): Take-profit distance in pips, none when 0.
+    """
+
+    def __init__(self, fast=10, slow=30, units=1000, stop_loss=0, take_profit=0, side='ask'):
+        super().__init__(fast=fast, slow=slow, units=units, stop_loss=stop_loss, take_profit=take_profit,
+                         side=side)
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.units = units
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.side = side
+        self.mode = None
+
+    def on_candle(self, candle, context):
+        fast = self.fast.update_candle(candle, self.side)
+        slow = self.slow.update_candle(candle, self.side)
+        if fast is None or slow is None or fast == slow:
+            return None
+        mode = 'long' if fast > slow else 'short'
+        if mode == self.mode and len(context.positions):
+            return None
+        self.mode = mode
+        entry = context.ask if mode == 'long' else context.bid
+        stop_price, take_price = exits(mode, entry, self.stop_loss, self.take_profit)
+        return [close(), market(mode, self.units, stop_price, take_price)]
+
+
+class RSIReversion(Strategy):
+    """
+    Buys when the RSI of the candle closes is oversold, sells when it is overbought, and closes the
+    position once the RSI is back to 50.
+
+    Params:
+        period (int): Period of the RSI, in candles.
+        lower (float): Oversold level.
+        upper (float): Overbought level.
+        units (float): Units of every position.
+    """
+
+    def __init__(self, period=14, lower=30, upper=70, units=1000, side='ask'):
+        super().__init__(period=period, lower=lower, upper=upper, units=units, side=side)
+        self.rsi = RSI(period)
+        self.lower = lower
+        self.upper = upper
+        self.units = units
+        self.side = side
+
+    def on_candle(self, candle, context):
+        rsi = self.rsi.update_candle(candle, self.side)
+        if rsi is None:
+            return None
+        positions = context.positions
+        if len(positions):
+            long = context.side(positions[0]) == 'long'
+            if (long and rsi >= 50) or (not long and rsi <= 50):
+                return [close()]
+            return None
+        if rsi < self.lower:
+            return [market('long', self.units)]
+        if rsi > self.upper:
+            return [market('short', self.units)]
+        return None
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from indicators import ATR, EMA, RSI, SMA, VWAP, Bollinger, atr, bollinger, ema, rsi, sma, vwap
+
+
+def stream(indicator, *columns):
+    values = [indicator.update(*row) for row in zip(*columns)]
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+@pytest.fixture(scope='module')
+def prices():
+    return 1.1 + np.cumsum(np.random.default_rng(11).normal(0, 1e-4, 3000))
+
+
+@pytest.mark.parametrize('period', [1, 5, 20])
+def test_sma_ema_rsi_match(prices, period):
+    np.testing.assert_allclose(stream(SMA(period), prices), sma(prices, period), rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(stream(EMA(period), prices), ema(prices, period), rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(stream(RSI(period), prices), rsi(prices, period), rtol=1e-9, atol=1e-9,
+                               equal_nan=True)
+
+
+def test_bollinger_match(prices):
+    bands = Bollinger(20, 2.0)
+    values = [bands.update(price) for price in prices]
+    middle, upper, lower = bollinger(prices, 20, 2.0)
+    assert all(value is None for value in values[:19])
+    np.testing.assert_allclose([value[0] for value in values[19:]], middle[19:], rtol=1e-12)
+    np.testing.assert_allclose([value[1] for value in values[19:]], upper[19:], rtol=1e-9)
+    np.testing.assert_allclose([value[2] for value in values[19:]], lower[19:], rtol=1e-9)
+
+
+def test_atr_match(prices):
+    high = prices + 0.0004
+    low = prices - 0.0003
+    close = np.roll(prices, -1)
+    np.testing.assert_allclose(stream(ATR(14), high, low, close), atr(high, low, close, 14), rtol=1e-9,
+                               equal_nan=True)
+
+
+@pytest.mark.parametrize('period', [None, 50])
+def test_vwap_match(prices, period):
+    volumes = np.arange(len(prices)) % 7 + 1.0
+    np.testing.assert_allclose(stream(VWAP(period), prices, volumes), vwap(prices, volumes, period),
+                               rtol=1e-12)
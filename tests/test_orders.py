@@ -0,0 +1,95 @@
+import numpy as np
+
+from orders import LIMIT, STOP, OrderBook
+from portfolio import Portfolio
+
+
+def test_entry_orders_trigger_on_their_side_of_the_spread():
+    book = OrderBook()
+    buy_limit = book.place(0, 'long', LIMIT, 1.0990, 1000)
+    buy_stop = book.place(0, 'long', STOP, 1.1010, 1000)
+    sell_limit = book.place(0, 'short', LIMIT, 1.1010, 1000)
+    sell_stop = book.place(0, 'short', STOP, 1.0990, 1000)
+
+    assert book.match(1.1000, 1.1002) == []
+    # Buy orders compare with the ask, sell orders with the bid
+    assert book.match(1.0989, 1.0991) == [sell_stop]
+    assert book.match(1.0988, 1.0990) == [buy_limit]
+    assert book.match(1.1008, 1.1010) == [buy_stop]
+    assert book.match(1.1010, 1.1012) == [sell_limit]
+    assert len(book) == 0
+
+
+def test_price_priority_then_submission_order():
+    book = OrderBook()
+    low = book.place(0, 'long', LIMIT, 1.0980, 1000)
+    first = book.place(1, 'long', LIMIT, 1.0990, 1000)
+    second = book.place(2, 'long', LIMIT, 1.0990, 1000)
+    assert book.match(1.0970, 1.0975) == [first, second, low]
+
+
+def test_symbols_are_matched_separately():
+    book = OrderBook()
+    order = book.place(0, 'long', LIMIT, 1.0990, 1000, symbol=1)
+    assert book.match(1.0980, 1.0985, symbol=0) == []
+    assert book.match(1.0980, 1.0985, symbol=1) == [order]
+
+
+def test_stop_loss_and_take_profit_cancel_each_other():
+    book = OrderBook()
+    stop_loss, take_profit = book.attach(7, 0, 'long', 1000, stop_loss=1.0950, take_profit=1.1050)
+    assert stop_loss.oco == take_profit.id and take_profit.oco == stop_loss.id
+
+    # Exits of a long position are sells, triggered by the bid
+    assert book.match(1.1049, 1.1051) == []
+    assert book.match(1.1050, 1.1052) == [take_profit]
+    assert len(book) == 0 and book.by_position == {}
+    assert book.match(1.0900, 1.0902) == []
+
+
+def test_both_legs_crossed_on_one_tick_fire_once():
+    book = OrderBook()
+    # A short position: the stop-loss is a buy stop above, the take-profit a buy limit below
+    stop_loss, take_profit = book.attach(3, 0, 'short', 1000, stop_loss=1.1000, take_profit=1.1000)
+    fired = book.match(1.0998, 1.1000)
+    assert len(fired) == 1 and fired[0] in (stop_loss, take_profit)
+    assert len(book) == 0
+
+
+def test_cancel_position_and_cancel():
+    book = OrderBook()
+    book.attach(1, 0, 'long', 1000, stop_loss=1.0950, take_profit=1.1050)
+    entry = book.place(0, 'short', STOP, 1.0900, 1000)
+    book.cancel_position(1)
+    assert list(book.orders) == [entry.id]
+    assert book.cancel(entry.id)
+    assert not book.cancel(entry.id)
+    assert book.match(1.0000, 1.0002) == [] and book.match(1.2000, 1.2002) == []
+
+
+def test_cancelled_entries_do_not_pile_up():
+    book = OrderBook()
+    orders = [book.place(0, 'long', LIMIT, 1.0 + i * 1e-5, 1000) for i in range(1000)]
+    for order in orders[:-1]:
+        book.cancel(order.id)
+    assert len(book._heaps[0][0]) <= 3
+    assert book.match(0.5, 0.5002) == [orders[-1]]
+    assert book._heaps[0] == ([], [], [], [])
+
+
+def test_execute_fills_entries_and_exits_on_a_portfolio():
+    portfolio = Portfolio(4)
+    account = portfolio.add_account(10000)
+    book = OrderBook()
+    book.place(account, 'long', LIMIT, 1.0990, 1000)
+
+    opened, closed = book.execute(portfolio, 1.0988, 1.0990)
+    assert len(opened) == 1 and len(closed) == 0
+    position = int(opened[0])
+    assert portfolio.is_open[position]
+
+    book.attach(position, account, 'long', 1000, stop_loss=1.0950)
+    opened, closed = book.execute(portfolio, 1.0950, 1.0952)
+    np.testing.assert_array_equal(closed, [position])
+    assert not portfolio.is_open[position]
+    assert len(book) == 0
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from engine import Account
+from liquidation import Liquidator
+from montecarlo import simulate_paths
+from portfolio import Portfolio
+from price import price_paths
+
+
+def run_accounts(bid, ask, times, balance, mode, units):
+    accounts = []
+    for path in range(bid.shape[0]):
+        account = Account(balance)
+        account.on_tick(bid[path, 0], ask[path, 0], times[0])
+        account.open_position(mode, units)
+        stopped = False
+        for tick in range(1, bid.shape[1]):
+            if 'stop_out' in account.on_tick(bid[path, tick], ask[path, tick], times[tick]):
+                stopped = True
+                break
+        if account.trade_in_progress:
+            account.close_position()
+        accounts.append((account, stopped))
+    return accounts
+
+
+@pytest.mark.parametrize('mode', ['long', 'short'])
+def test_simulate_paths_matches_account(mode):
+    bid, ask, times = price_paths(200, 50, seed=7, start_bid=1.1000, start_ask=1.1002)
+    results = simulate_paths(bid, ask, times, balance=10000, mode=mode, units=10000)
+    accounts = run_accounts(bid, ask, times, 10000, mode, 10000)
+
+    np.testing.assert_allclose(results['final_balance'], [account.balance for account, _ in accounts],
+                               rtol=1e-12)
+    np.testing.assert_array_equal(results['stopped_out'], [stopped for _, stopped in accounts])
+    # The seed is chosen so that both outcomes are covered
+    assert results['stopped_out'].any() and not results['stopped_out'].all()
+
+
+def test_portfolio_status_matches_account():
+    bid, ask, times = price_paths(100, 1, seed=3, start_bid=1.1000, start_ask=1.1002)
+    account = Account(10000)
+    account.on_tick(bid[0, 0], ask[0, 0], times[0])
+    account.open_position('short', 5000)
+    portfolio = Portfolio(1)
+    portfolio.add_account(10000)
+    portfolio.open_position(0, 'short', 5000, bid[0, 0], ask[0, 0], times[0])
+    liquidator = Liquidator(portfolio)
+
+    for tick in range(1, bid.shape[1]):
+        events = account.on_tick(bid[0, tick], ask[0, tick], times[tick])
+        closed = liquidator.sweep(bid[0, tick], ask[0, tick], times[tick])
+        assert ('stop_out' in events) == (len(closed) > 0)
+        np.testing.assert_allclose(portfolio.status(0), account.status(), rtol=1e-12, atol=1e-9)
+        if not account.trade_in_progress:
+            break
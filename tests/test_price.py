@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from price import correlated_price_paths
+
+
+def move_correlation(corr, n_ticks=50000):
+    n_pairs = len(corr)
+    bid, ask = correlated_price_paths(n_ticks, np.full(n_pairs, 1.1), np.full(n_pairs, 1.1002), corr,
+                                      volatility=0.001, seed=2, decimals=10)
+    mid = (bid + ask) / 2
+    return np.corrcoef(np.diff(np.log(mid), axis=0), rowvar=False)
+
+
+def test_moves_follow_the_requested_correlation():
+    corr = np.array([[1.0, 0.9, 0.5], [0.9, 1.0, 0.3], [0.5, 0.3, 1.0]])
+    np.testing.assert_allclose(move_correlation(corr), corr, atol=0.02)
+
+
+def test_singular_matrices_are_allowed():
+    corr = np.array([[1.0, 1.0, -1.0], [1.0, 1.0, -1.0], [-1.0, -1.0, 1.0]])
+    np.testing.assert_allclose(move_correlation(corr, 5000), corr, atol=1e-6)
+
+
+def test_invalid_matrix_is_rejected():
+    corr = np.array([[1.0, 0.9, -0.9], [0.9, 1.0, 0.9], [-0.9, 0.9, 1.0]])
+    with pytest.raises(ValueError):
+        correlated_price_paths(10, [1.1] * 3, [1.1002] * 3, corr)
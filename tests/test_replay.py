@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from replay import build_csv_index, iter_csv_chunks, iter_store_chunks
+from tickstore import TICK_DTYPE, TickStore
+
+START = datetime(2024, 1, 2)
+N_TICKS = 1000
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'ticks.csv'
+    with open(path, 'w') as f:
+        f.write('time,bid,ask\n')
+        for tick in range(N_TICKS):
+            bid = 1.1 + tick * 1e-5
+            f.write(f'{(START + timedelta(seconds=tick)).isoformat()},{bid:.5f},{bid + 0.0002:.5f}\n')
+    return str(path)
+
+
+def collect(chunks):
+    chunks = list(chunks)
+    return tuple(np.concatenate([chunk[column] for chunk in chunks]) for column in range(3))
+
+
+@pytest.mark.parametrize('start, end', [(None, None), (0, 1000), (1, 999), (250, 251), (333, 777), (999, None),
+                                        (None, 10), (500, 500), (1000, None)])
+def test_index_seek_matches_full_scan(csv_path, start, end):
+    build_csv_index(csv_path, every=64)
+    start = None if start is None else START + timedelta(seconds=start)
+    end = None if end is None else START + timedelta(seconds=end)
+
+    bid, ask, times = collect(iter_csv_chunks(csv_path, chunksize=100, use_index=False))
+    keep = np.ones(len(times), dtype=bool)
+    if start is not None:
+        keep &= times >= np.datetime64(start)
+    if end is not None:
+        keep &= times < np.datetime64(end)
+
+    chunks = list(iter_csv_chunks(csv_path, start, end, chunksize=100))
+    if not keep.any():
+        assert chunks == []
+        return
+    seek_bid, seek_ask, seek_times = collect(chunks)
+    np.testing.assert_array_equal(seek_times, times[keep])
+    np.testing.assert_array_equal(seek_bid, bid[keep])
+    np.testing.assert_array_equal(seek_ask, ask[keep])
+
+
+def test_store_between_matches_csv(csv_path, tmp_path):
+    bid, ask, times = collect(iter_csv_chunks(csv_path, use_index=False))
+    records = np.zeros(len(times), dtype=TICK_DTYPE)
+    records['time'], records['bid'], records['ask'] = times, bid, ask
+    store = TickStore(str(tmp_path / 'ticks.bin'))
+    store.extend(records)
+    store.flush()
+
+    start, end = START + timedelta(seconds=123), START + timedelta(seconds=456)
+    expected = collect(iter_csv_chunks(csv_path, start, end))
+    for column, values in zip(expected, collect(iter_store_chunks(store, start, end, chunksize=50))):
+        np.testing.assert_array_equal(values, column)
+    store.close()
@@ -0,0 +1,94 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from candles import MultiCandleBuilder
+from engine import Account
+from journal import Journal
+from portfolio import Portfolio
+from price import price_paths
+from snapshot import Snapshot
+
+START = datetime(2024, 1, 2, 9, 30)
+
+
+def round_trip(snapshot):
+    return Snapshot.from_bytes(snapshot.to_bytes())
+
+
+def test_account_round_trip():
+    account = Account(10000)
+    account.on_tick(1.1000, 1.1002, np.datetime64('2024-01-02T09:30:00'))
+    account.open_position('long', 10000)
+    account.on_tick(1.1010, 1.1012, np.datetime64('2024-01-02T09:30:05'))
+
+    restored = round_trip(Snapshot.capture(account, rng=None)).account()
+    assert restored.status() == account.status()
+    assert restored.last_time == account.last_time
+    assert restored.position.mode == 'long'
+    assert restored.position.enter_ask_price == account.position.enter_ask_price
+
+    # Both accounts carry on identically
+    for copy in (account, restored):
+        copy.on_tick(1.0990, 1.0992, START)
+        copy.close_position()
+    assert restored.status() == account.status()
+
+
+def test_journal_and_candles_round_trip():
+    bid, ask, _ = price_paths(500, 1, seed=1, start_bid=1.1000, start_ask=1.1002)
+    account = Account(10000)
+    journal = Journal()
+    candles = MultiCandleBuilder((5, 30))
+    for tick in range(500):
+        time = START + timedelta(seconds=tick)
+        account.on_tick(bid[0, tick], ask[0, tick], time)
+        candles.update(bid[0, tick], ask[0, tick], time)
+        if tick % 50 == 0:
+            account.open_position('short', 1000)
+        elif tick % 50 == 25:
+            journal.record_trade(account.close_position(), account.balance)
+        journal.record_equity(time, account.status())
+
+    snapshot = round_trip(Snapshot.capture(candles=candles, journal=journal, rng=None))
+    restored = snapshot.journal()
+    np.testing.assert_array_equal(restored.trades.records, journal.trades.records)
+    np.testing.assert_array_equal(restored.equity.records, journal.equity.records)
+
+    restored_candles = snapshot.candles()
+    for timeframe in (5, 30):
+        original, copy = candles[timeframe], restored_candles[timeframe]
+        assert [c.as_tuple('bid') for c in copy.candles] == [c.as_tuple('bid') for c in original.candles]
+        assert copy.current.as_tuple() == original.current.as_tuple()
+        assert copy.current.volume == original.current.volume
+
+
+def test_portfolio_round_trip():
+    portfolio = Portfolio(8)
+    portfolio.add_accounts([10000, 5000, 2000])
+    portfolio.open_many([0, 1, 2, 0], ['long', 'short', 'long', 'short'], [1000, 2000, 500, 1500],
+                        1.1000, 1.1002, START)
+    portfolio.close_position(1, 1.1010, 1.1012, START)
+    portfolio.mark_to_market(1.1020, 1.1022)
+
+    restored = round_trip(Snapshot.capture(portfolio=portfolio, rng=None)).portfolio()
+    for copy in (portfolio, restored):
+        copy.mark_to_market(1.0980, 1.0982)
+    for account in range(3):
+        assert restored.status(account) == portfolio.status(account)
+    np.testing.assert_array_equal(restored.open_positions, portfolio.open_positions)
+
+
+def test_random_state_and_extra_round_trip(tmp_path):
+    rng = random.Random(5)
+    rng.gauss(0, 1)
+    path = str(tmp_path / 'state.npz')
+    Snapshot.capture(rng=rng, clock=START).save(path)
+    expected = [rng.gauss(0, 1) for _ in range(3)]
+
+    snapshot = Snapshot.load(path)
+    restored = random.Random()
+    snapshot.restore_random(restored)
+    assert [restored.gauss(0, 1) for _ in range(3)] == expected
+    assert snapshot.extra['clock'] == START
@@ -0,0 +1,172 @@
+"""
+On-disk storage of ticks and finished candles.
+
+Records are appended in batches to raw files of fixed-dtype NumPy records and read back through
+numpy.memmap, so a history much larger than memory can be sliced by time range without loading it.
+Records must be appended in time order; time-range lookups are binary searches on the time column.
+"""
+
+import os
+
+import numpy as np
+
+TICK_DTYPE = np.dtype([('time', '<M8[us]'), ('bid', '<f8'), ('ask', '<f8')])
+CANDLE_DTYPE = np.dtype([('time', '<M8[us]'),
+                         ('bid_open', '<f8'), ('bid_high', '<f8'), ('bid_low', '<f8'), ('bid_close', '<f8'),
+                         ('ask_open', '<f8'), ('ask_high', '<f8'), ('ask_low', '<f8'), ('ask_close', '<f8'),
+                         ('volume', '<i8')])
+
+
+def to_datetime64(price_time):
+    """
+    Converts a datetime, datetime64 or ISO string to numpy datetime64 with microsecond resolution.
+    """
+    return np.datetime64(price_time, 'us')
+
+
+class RecordStore:
+    """
+    Append-only file of fixed-dtype records.
+
+    Appended records are buffered and written `batch_size` at a time; call flush (or close) to make
+    buffered records visible to readers.
+    """
+
+    def __init__(self, path, dtype, batch_size=4096):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.batch_size = batch_size
+        self._buffer = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) % self.dtype.itemsize:
+            raise ValueError(f"{path} is not a file of {self.dtype} records")
+
+    def __len__(self):
+        return self.stored + len(self._buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def stored(self):
+        """
+        The number of records written to disk.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // self.dtype.itemsize
+
+    def append(self, record):
+        """
+        Buffers one record given as a tuple in the field order of the dtype.
+        """
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def extend(self, records):
+        """
+        Writes an array of records (with the store's dtype) after the buffered ones.
+        """
+        self.flush()
+        with open(self.path, 'ab') as f:
+            np.asarray(records, dtype=self.dtype).tofile(f)
+
+    def flush(self):
+        """
+        Writes the buffered records to disk.
+        """
+        if not self._buffer:
+            return
+        records = np.array(self._buffer, dtype=self.dtype)
+        self._buffer = []
+        with open(self.path, 'ab') as f:
+            records.tofile(f)
+
+    def close(self):
+        self.flush()
+
+    def read(self):
+        """
+        Returns a read-only memory map of every record written to disk.
+        """
+        if self.stored == 0:
+            return np.zeros(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode='r', shape=(self.stored,))
+
+    def between(self, start=None, end=None):
+        """
+        Returns the records with start <= time < end as a slice of the memory map.
+
+        Args:
+            start (datetime): Start of the range, open-ended when None.
+            end (datetime): End of the range, open-ended when None.
+        """
+        records = self.read()
+        times = records['time']
+        first = 0 if start is None else int(np.searchsorted(times, to_datetime64(start), 'left'))
+        last = len(records) if end is None else int(np.searchsorted(times, to_datetime64(end), 'left'))
+        return records[first:last]
+
+
+class TickStore(RecordStore):
+    """
+    Store of (time, bid, ask) ticks.
+    """
+
+    def __init__(self, path, batch_size=4096):
+        super().__init__(path, TICK_DTYPE, batch_size)
+
+    def append(self, bid_price, ask_price, price_time):
+        super().append((to_datetime64(price_time), bid_price, ask_price))
+
+
+class CandleStore:
+    """
+    Store of finished candles, one record file per timeframe inside `directory`.
+    """
+
+    def __init__(self, directory, batch_size=256):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.stores = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def __getitem__(self, timeframe):
+        if timeframe not in self.stores:
+            path = os.path.join(self.directory, f'candles_{timeframe}s.bin')
+            self.stores[timeframe] = RecordStore(path, CANDLE_DTYPE, self.batch_size)
+        return self.stores[timeframe]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, timeframe, candle):
+        """
+        Buffers a finished candles.Candle of the given timeframe.
+        """
+        self[timeframe].append((to_datetime64(candle.time),
+                                candle.bid_open, candle.bid_high, candle.bid_low, candle.bid_close,
+                                candle.ask_open, candle.ask_high, candle.ask_low, candle.ask_close,
+                                candle.volume))
+
+    def flush(self):
+        for store in self.stores.values():
+            store.flush()
+
+    def close(self):
+        self.flush()
+
+    def between(self, timeframe, start=None, end=None):
+        """
+        Returns the candles of a timeframe starting in [start, end) as a slice of the memory map.
+        """
+        return self[timeframe].between(start, end)
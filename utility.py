@@ -1,27 +1,7 @@
-import pandas as pd
-from plotly.offline import plot
-
-def update_candlestick_chart(candlesticks, fig, type):
-    df = pd.DataFrame(candlesticks, columns=['time', 'open', 'close', 'high', 'low'])
-    if type == 'candle': 
-        fig.update_traces(x=df['time'], open=df['open'], high=df['high'], low=df['low'], close=df['close'])
-        fig.update_layout(title='Candlestick Chart', xaxis_rangeslider_visible=False)
-        fig.update_layout(
-            xaxis=dict(
-                tickformat="%H:%M:%S"# Format the x-axis to show only time
-            )
-        )
-        plot_html = plot(fig, output_type='div', include_plotlyjs='cdn')
-    else:
-        fig.update_traces(x=df['time'], y=df['close'])
-        fig.update_layout(title='Line Chart', xaxis_rangeslider_visible=False)
-        fig.update_layout(
-            xaxis=dict(
-                tickformat="%H:%M:%S" # Format the x-axis to show only time
-            )
-        )
-        plot_html = plot(fig, output_type='div', include_plotlyjs='cdn')
-    return plot_html, df
+import time
+from queue import Empty, Queue
+
+from metrics import METRICS
 
 
 def is_float(input_str):
@@ -36,4 +16,50 @@ def format_currency(amount, unit='$'):
         if unit=='$':
             return '${:,.2f}'.format(amount)
         else:
-            return '€{:,.2f}'.format(amount)            
\ No newline at end of file
+            return '€{:,.2f}'.format(amount)
+
+
+def format_percent(value):
+    return str(value) + '%'
+
+
+class StampedQueue(Queue):
+    """
+    Queue remembering the wall-clock (perf_counter) time every item was put.
+
+    The time an item waited is recorded in the 'queue_wait' histogram when it is taken out, and the put
+    time of the last item taken is kept in last_stamp, whatever clock the ticks themselves are stamped with.
+    """
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.last_stamp = None
+
+    def _put(self, item):
+        self.queue.append((time.perf_counter(), item))
+
+    def _get(self):
+        stamp, item = self.queue.popleft()
+        self.last_stamp = stamp
+        METRICS.observe('queue_wait', time.perf_counter() - stamp)
+        return item
+
+
+def drain_queue(queue, max_items=None):
+    """
+    Takes every item currently waiting in a queue without blocking.
+
+    Args:
+        queue (Queue): The queue to drain.
+        max_items (int): Stop after this many items, leaving the rest for the next call.
+
+    Returns:
+        list: The items in queue order.
+    """
+    items = []
+    while max_items is None or len(items) < max_items:
+        try:
+            items.append(queue.get_nowait())
+        except Empty:
+            break
+    return items